@@ -1,21 +1,59 @@
 import re
 from collections import Counter, defaultdict
+import pandas as pd
 from config import DOMAIN_HASHTAGS
 
-def extract_hashtags(captions, top_n=20):
+HASHTAG_PATTERN = re.compile(r"#\w+")
+
+_domain_index = {}
+_domain_index_source = None
+
+
+def get_domain_index():
+    """
+    Lowercase hashtag -> domain lookup built from DOMAIN_HASHTAGS.
+    Rebuilt only when the taxonomy changes. When a hashtag is listed under
+    several domains the first one wins, as with the old linear scan.
     """
-    Extract and count hashtags from Instagram captions
+    global _domain_index, _domain_index_source
+    
+    source = tuple((domain_name, tuple(domain_tags)) for domain_name, domain_tags in DOMAIN_HASHTAGS.items())
+    if source != _domain_index_source:
+        index = {}
+        for domain_name, domain_tags in source:
+            for tag in domain_tags:
+                index.setdefault(tag.lower(), domain_name)
+        _domain_index, _domain_index_source = index, source
+    
+    return _domain_index
+
+
+def build_hashtag_table(captions):
+    """
+    Extract every hashtag from the captions in a single vectorized pass.
+    Returns a Series with one lowercase hashtag per occurrence, indexed like
+    the caption it came from, that all the analyzers below can reuse.
+    """
+    if captions.empty or not (pd.api.types.is_object_dtype(captions) or pd.api.types.is_string_dtype(captions)):
+        return pd.Series([], dtype=object, name="hashtag")
+    
+    # Non-string captions become NaN here and drop out after the explode
+    hashtags = captions.str.lower().str.findall(HASHTAG_PATTERN).explode().dropna()
+    return hashtags.astype(object).rename("hashtag")
+
+
+def extract_hashtags(captions, top_n=20, hashtags=None):
+    """
+    Extract and count hashtags from Instagram captions.
+    Pass a precomputed build_hashtag_table() result as hashtags to skip re-scanning.
     """
     if captions.empty:
         print("⚠️  No captions found for hashtag analysis")
         return []
     
-    hashtags = []
-    for caption in captions.dropna():
-        if isinstance(caption, str):
-            # Find all hashtags in the caption
-            found_hashtags = re.findall(r"#\w+", caption.lower())
-            hashtags.extend(found_hashtags)
+    if hashtags is None:
+        hashtags = build_hashtag_table(captions)
+    hashtags = hashtags.tolist()
     
     if not hashtags:
         print("⚠️  No hashtags found in the captions")
@@ -26,19 +64,18 @@ def extract_hashtags(captions, top_n=20):
     return hashtag_counts.most_common(top_n)
 
 
-def analyze_domain_hashtags(captions, domain=None):
+def analyze_domain_hashtags(captions, domain=None, hashtags=None):
     """
-    Advanced hashtag analysis with domain-specific insights
+    Advanced hashtag analysis with domain-specific insights.
+    Pass a precomputed build_hashtag_table() result as hashtags to skip re-scanning.
     """
     if captions.empty:
         print("⚠️  No captions found for hashtag analysis")
         return {}
     
-    hashtags = []
-    for caption in captions.dropna():
-        if isinstance(caption, str):
-            found_hashtags = re.findall(r"#\w+", caption.lower())
-            hashtags.extend(found_hashtags)
+    if hashtags is None:
+        hashtags = build_hashtag_table(captions)
+    hashtags = hashtags.tolist()
     
     if not hashtags:
         print("⚠️  No hashtags found in the captions")
@@ -52,15 +89,12 @@ def analyze_domain_hashtags(captions, domain=None):
     domain_categories = defaultdict(list)
     uncategorized = []
     
+    domain_index = get_domain_index()
     for hashtag, count in hashtag_counts.items():
-        categorized = False
-        for domain_name, domain_tags in DOMAIN_HASHTAGS.items():
-            if hashtag in [tag.lower() for tag in domain_tags]:
-                domain_categories[domain_name].append((hashtag, count))
-                categorized = True
-                break
-        
-        if not categorized:
+        domain_name = domain_index.get(hashtag)
+        if domain_name is not None:
+            domain_categories[domain_name].append((hashtag, count))
+        else:
             uncategorized.append((hashtag, count))
     
     # Sort each category by count
@@ -82,17 +116,15 @@ def analyze_domain_hashtags(captions, domain=None):
     return analysis
 
 
-def find_trending_hashtags(captions, min_frequency=2):
+def find_trending_hashtags(captions, min_frequency=2, hashtags=None):
     """
-    Find trending hashtags that appear multiple times
+    Find trending hashtags that appear multiple times.
+    Pass a precomputed build_hashtag_table() result as hashtags to skip re-scanning.
     """
-    hashtags = []
-    for caption in captions.dropna():
-        if isinstance(caption, str):
-            found_hashtags = re.findall(r"#\w+", caption.lower())
-            hashtags.extend(found_hashtags)
+    if hashtags is None:
+        hashtags = build_hashtag_table(captions)
     
-    hashtag_counts = Counter(hashtags)
+    hashtag_counts = Counter(hashtags.tolist())
     trending = [(tag, count) for tag, count in hashtag_counts.items() 
                 if count >= min_frequency]
     
@@ -1,6 +1,16 @@
 import pandas as pd
+from time_slots import compute_time_slots
 
-def analyze_posting_schedule(df):
-    df["day_of_week"] = df["takenAtTimestamp"].dt.day_name()
-    df["hour"] = df["takenAtTimestamp"].dt.hour
-    return df.groupby(["day_of_week", "hour"]).size().unstack(fill_value=0)
+def analyze_posting_schedule(df, slots=None):
+    """
+    Number of posts per day of week (rows) and hour (columns), for the days and
+    hours that have posts. df is not modified; pass precomputed time slots to
+    skip the aggregation.
+    """
+    if slots is None:
+        slots = compute_time_slots(df)
+
+    counts = slots.matrix("count")
+    counts = counts.loc[counts.any(axis=1), counts.any(axis=0)].sort_index()
+    counts.index.name = "day_of_week"
+    return counts
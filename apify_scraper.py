@@ -1,27 +1,634 @@
 import requests
+from requests.adapters import HTTPAdapter
+import asyncio
+import collections
+import contextlib
+import contextvars
+import email.utils
+import itertools
+import threading
 import time
 import json
 import random
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from cache import get_result_cache, get_profile_history, get_run_journal, RESULT_CACHE_ENABLED, RUN_JOURNAL_ENABLED
+from instrumentation import metrics, report_progress, COUNT_BUCKETS
 from config import APIFY_TOKEN, MAX_POSTS, SEARCH_TYPE, MAX_RETRIES, RETRY_DELAY, DOMAIN_HASHTAGS, USE_TRENDING_HASHTAGS
 
 PUBLIC_ACTOR_ID = "apify~instagram-scraper"
 
+APIFY_API_BASE = "https://api.apify.com/v2"
+HTTP_POOL_SIZE = 10        # Keep-alive connections kept open per host
+HTTP_CONNECT_TIMEOUT = 10  # Seconds to establish a connection
+HTTP_READ_TIMEOUT = 60     # Seconds to wait for a response body
 
-def run_scraper_by_hashtag(hashtags_list, max_posts=None):
+TERMINAL_STATUSES = ('SUCCEEDED', 'FAILED', 'ABORTED', 'TIMED-OUT')
+WAIT_FOR_FINISH_SECS = 60             # Server-side long-poll per request (Apify caps this at 60)
+RUN_TIMEOUT = MAX_RETRIES * 6 * RETRY_DELAY  # Total time to wait for a run to finish
+BACKOFF_INITIAL = 1.0                 # First fallback delay between polls, in seconds
+BACKOFF_MAX = 30.0                    # Upper bound for the fallback delay
+DATASET_PAGE_SIZE = 1000              # Items requested per dataset page
+
+API_REQUESTS_PER_SECOND = 60          # Client-side budget for all Apify API calls (Apify allows 60/s per resource)
+API_BURST = 60                        # Calls that may go out back-to-back before throttling
+MAX_ACTIVE_RUNS = 25                  # Actor runs in flight at once across the process (plan concurrency limit)
+RETRY_STATUSES = (429, 503)           # Responses retried after the server's Retry-After delay
+API_MAX_RETRIES = 5                   # Retries per call before the error is raised
+RETRY_AFTER_MAX = 60.0                # Upper bound for a single Retry-After wait, in seconds
+RUN_SLOT_POLL_INTERVAL = 0.25         # How often async scrapes re-check for a free run slot, in seconds
+
+HASHTAG_FANOUT = 5                    # Hashtags scraped concurrently per domain (1 = single random tag)
+MAX_CONCURRENT_RUNS = 5               # Worker threads waiting on actor runs at once
+
+REUSE_RECENT_RUNS = True              # Look for a matching finished run before starting a new one
+REUSE_RUN_MAX_AGE = 30 * 60           # Only reuse runs that finished within this many seconds
+REUSE_RUN_LOOKBACK = 20               # Number of recent successful runs inspected
+RUN_INPUT_MEMO_SIZE = 512             # Run INPUT records remembered by key-value store id
+
+INCREMENTAL_PROFILES = True           # Only fetch profile posts newer than the stored snapshot
+INCREMENTAL_STOP_AFTER_KNOWN = 4      # Consecutive stored posts that end a profile stream (more than the 3 pinned posts)
+
+PROFILE_BATCH_SIZE = 10               # Profiles packed into one actor run by run_scraper_batch
+
+
+class RunFailedError(Exception):
     """
-    Run Instagram scraper using Apify actor for hashtag-based searches
+    An actor run failed, was aborted or did not finish in time
     """
-    if max_posts is None:
-        max_posts = MAX_POSTS
+
+
+class ApifyClient:
+    """
+    Minimal Apify REST client that reuses pooled keep-alive connections
+    instead of opening a new TCP/TLS connection for every request
+    """
+
+    def __init__(self, token=APIFY_TOKEN, base_url=APIFY_API_BASE, pool_size=HTTP_POOL_SIZE,
+                 connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT, governor=None):
+        self.token = token
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.governor = governor or get_governor()
+        
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method, path, params=None, endpoint="other", **kwargs):
+        """
+        Send an authenticated request through the governor and raise for HTTP errors.
+        429/503 responses are retried after their Retry-After delay.
+        Latency, status and response size are recorded per endpoint name.
+        """
+        params = dict(params or {})
+        params['token'] = self.token
+        kwargs.setdefault('timeout', self.timeout)
+        
+        attempt = 0
+        while True:
+            self.governor.throttle()
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, f"{self.base_url}{path}", params=params, **kwargs)
+            except requests.exceptions.RequestException:
+                metrics.inc("apify_requests_total", endpoint=endpoint, status="error")
+                raise
+            finally:
+                metrics.observe("apify_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+            
+            metrics.inc("apify_requests_total", endpoint=endpoint, status=response.status_code)
+            metrics.inc("apify_bytes_downloaded_total", len(response.content), endpoint=endpoint)
+            
+            delay = self.governor.retry_delay(response, attempt)
+            if delay is None:
+                break
+            attempt += 1
+            metrics.inc("apify_retries_total", endpoint=endpoint, status=response.status_code)
+            time.sleep(delay)
+        
+        response.raise_for_status()
+        return response
+
+    def start_run(self, actor_id, payload):
+        """
+        Start an actor run and return its run object
+        """
+        return self.request("POST", f"/acts/{actor_id}/runs", json=payload, endpoint="start_run").json()['data']
+
+    def get_run(self, actor_id, run_id, wait_for_finish=0):
+        """
+        Fetch the current run object (status, defaultDatasetId, ...).
+        With wait_for_finish > 0 the API holds the request open until the run
+        finishes or that many seconds pass.
+        """
+        params = {}
+        timeout = self.timeout
+        if wait_for_finish:
+            params['waitForFinish'] = int(wait_for_finish)
+            timeout = (self.timeout[0], self.timeout[1] + wait_for_finish)
+        return self.request("GET", f"/acts/{actor_id}/runs/{run_id}",
+                            params=params, timeout=timeout, endpoint="get_run").json()['data']
+
+    def list_runs(self, actor_id, limit=REUSE_RUN_LOOKBACK, status=None):
+        """
+        List the actor's most recent runs, newest first
+        """
+        params = {'desc': 1, 'limit': limit}
+        if status:
+            params['status'] = status
+        return self.request("GET", f"/acts/{actor_id}/runs", params=params,
+                            endpoint="list_runs").json()['data']['items']
+
+    def get_record(self, store_id, key):
+        """
+        Fetch a JSON record from a key-value store (e.g. a run's INPUT)
+        """
+        return self.request("GET", f"/key-value-stores/{store_id}/records/{key}",
+                            endpoint="get_record").json()
+
+    def get_dataset_items(self, dataset_id):
+        """
+        Fetch all items of a dataset
+        """
+        return self.request("GET", f"/datasets/{dataset_id}/items", endpoint="dataset_items").json()
+
+    def iter_dataset_items(self, dataset_id, page_size=DATASET_PAGE_SIZE):
+        """
+        Yield dataset items page by page (offset/limit) so only one page
+        is held in memory at a time
+        """
+        offset = 0
+        while True:
+            page = self.request("GET", f"/datasets/{dataset_id}/items",
+                                params={'offset': offset, 'limit': page_size},
+                                endpoint="dataset_items").json()
+            yield from page
+            report_progress("items_fetched", f"Fetched {offset + len(page)} items", items=offset + len(page))
+            if len(page) < page_size:
+                return
+            offset += len(page)
+
+    def close(self):
+        self.session.close()
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket allowing `rate` calls per second, with bursts of up to `burst`
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token and return how many seconds the caller must wait before using it
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """
+        Block until a token is available
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+class ApiGovernor:
+    """
+    Shared throttle for every Apify API call made by this process.
     
-    run_url = f"https://api.apify.com/v2/acts/{PUBLIC_ACTOR_ID}/runs?token={APIFY_TOKEN}"
+    Calls draw from a requests-per-second token bucket, actor runs (sync or
+    async) hold one of max_active_runs slots while they are in flight, and a 429/503 answer pauses
+    all callers for the server's Retry-After delay before the call is retried.
+    A rate of None disables the request budget.
+    """
+
+    def __init__(self, requests_per_second=API_REQUESTS_PER_SECOND, burst=API_BURST,
+                 max_active_runs=MAX_ACTIVE_RUNS, max_retries=API_MAX_RETRIES):
+        self.limiter = RateLimiter(requests_per_second, burst) if requests_per_second else None
+        self.max_retries = max_retries
+        self._run_slots = threading.BoundedSemaphore(max_active_runs)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a request token and return how many seconds the caller must wait before sending
+        """
+        with self._lock:
+            paused = max(0.0, self._paused_until - time.monotonic())
+        wait = self.limiter.reserve() if self.limiter else 0.0
+        return max(wait, paused)
+
+    def throttle(self):
+        """
+        Block until the next request may be sent
+        """
+        wait = self.reserve()
+        if wait > 0:
+            metrics.observe("apify_throttle_seconds", wait)
+            time.sleep(wait)
+
+    def retry_delay(self, response, attempt):
+        """
+        Seconds to wait before retrying a throttled response, or None if it should not be retried.
+        Retry-After (seconds or an HTTP date) is honored and pauses every caller;
+        without it the delay doubles with each attempt.
+        """
+        if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+            return None
+        
+        delay = _parse_retry_after(response.headers.get('Retry-After'))
+        if delay is None:
+            delay = BACKOFF_INITIAL * 2 ** attempt
+        delay = min(delay, RETRY_AFTER_MAX) + random.uniform(0, BACKOFF_INITIAL / 2)
+        
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    @contextlib.contextmanager
+    def run_slot(self):
+        """
+        Hold one of the process-wide actor run slots, waiting for a free one
+        """
+        start = time.perf_counter()
+        with self._run_slots:
+            metrics.observe("apify_run_slot_wait_seconds", time.perf_counter() - start)
+            yield
+
+    @contextlib.asynccontextmanager
+    async def async_run_slot(self, poll_interval=RUN_SLOT_POLL_INTERVAL):
+        """
+        Hold one of the same process-wide run slots from a coroutine. The slot is
+        polled for with asyncio.sleep so waiting never blocks the event loop.
+        """
+        start = time.perf_counter()
+        while not self._run_slots.acquire(blocking=False):
+            await asyncio.sleep(poll_interval)
+        try:
+            metrics.observe("apify_run_slot_wait_seconds", time.perf_counter() - start)
+            yield
+        finally:
+            self._run_slots.release()
+
+
+def _parse_retry_after(value):
+    """
+    Seconds to wait from a Retry-After header value, or None if absent or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_governor():
+    """
+    Return the process-wide ApiGovernor, creating it on first use
+    """
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = ApiGovernor()
+        return _governor
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Return the process-wide ApifyClient, creating it on first use
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ApifyClient()
+        return _client
+
+
+def set_client(client):
+    """
+    Replace the process-wide ApifyClient (e.g. to point at another base URL)
+    """
+    global _client
+    with _client_lock:
+        if _client is not None and _client is not client:
+            _client.close()
+        _client = client
+
+
+def wait_for_run(run_id, actor_id=PUBLIC_ACTOR_ID, timeout=RUN_TIMEOUT, verbose=True):
+    """
+    Wait for an actor run to reach a terminal status and return its run object.
     
-    # Select a random hashtag from the list for better variety
-    selected_hashtag = random.choice(hashtags_list)
-    hashtag_url = f"https://www.instagram.com/explore/tags/{selected_hashtag.replace('#', '')}/"
+    Each poll asks the API to hold the request open (waitForFinish), so we
+    learn about completion as soon as it happens. If a poll comes back early or
+    fails transiently we back off exponentially with jitter before retrying.
+    Returns the last run object seen (whose status is not terminal if the
+    timeout expired), or None if the run could not be fetched at all.
+    """
+    client = get_client()
+    deadline = time.monotonic() + timeout
+    delay = BACKOFF_INITIAL
+    run = None
+    polls = 0
     
-    # Configure payload for hashtag search
-    payload = {
+    while True:
+        remaining = deadline - time.monotonic()
+        wait = int(max(0, min(WAIT_FOR_FINISH_SECS, remaining)))
+        poll_started = time.monotonic()
+        long_polled = False
+        polls += 1
+        metrics.inc("apify_run_polls_total")
+        
+        try:
+            run = client.get_run(actor_id, run_id, wait_for_finish=wait)
+            status = run['status']
+            if verbose:
+                print(f"Run status: {status} (poll {polls})")
+            report_progress("run_status", f"Run {run_id}: {status} (poll {polls})", run_id=run_id, status=status, polls=polls)
+            if status in TERMINAL_STATUSES:
+                metrics.observe("apify_run_polls", polls, buckets=COUNT_BUCKETS)
+                return run
+            # The server held the request for the full window: poll again right away
+            long_polled = wait > 0 and time.monotonic() - poll_started >= wait * 0.9
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code < 500 and e.response.status_code != 429:
+                raise
+            print(f"⚠️  Transient error while polling run {run_id}: {e}")
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            print(f"⚠️  Transient error while polling run {run_id}: {e}")
+        
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            metrics.observe("apify_run_polls", polls, buckets=COUNT_BUCKETS)
+            return run
+        
+        if long_polled:
+            delay = BACKOFF_INITIAL
+            continue
+        
+        sleep_for = min(remaining, delay / 2 + random.uniform(0, delay / 2))
+        time.sleep(sleep_for)
+        delay = min(delay * 2, BACKOFF_MAX)
+
+
+def report_run_outcome(payload, run_id, run, timeout, verbose=True):
+    """
+    Print how a waited-on run ended and return True if it SUCCEEDED.
+    Failed runs are dropped from the run journal; runs that are still going stay
+    journaled so the next scrape of the payload can reattach to them. Succeeded
+    runs are dropped once their dataset has been read (see forget_run_when_read).
+    """
+    status = run['status'] if run else 'UNKNOWN'
+    
+    if status == 'SUCCEEDED':
+        if verbose:
+            print("✅ Run completed successfully!")
+        return True
+    
+    if status in TERMINAL_STATUSES:
+        print(f"❌ Actor run failed with status: {status}")
+        if verbose:
+            print(f"Full status response: {json.dumps(run, indent=2)}")
+        if RUN_JOURNAL_ENABLED:
+            get_run_journal().remove(payload, run_id)
+    else:
+        print(f"❌ Run {run_id} did not finish within {timeout}s (last status: {status})")
+        if RUN_JOURNAL_ENABLED:
+            print("🔗 The run keeps going on Apify; the next scrape with the same input will reattach to it")
+    return False
+
+
+def run_actor(payload, timeout=RUN_TIMEOUT, verbose=True):
+    """
+    Start an actor run for the payload and wait for it to finish.
+    The run is journaled as soon as it starts (see resume_run).
+    Returns the run object if it SUCCEEDED, otherwise None.
+    """
+    client = get_client()
+    # Hold a run slot until the run is over so we never exceed the account's concurrent run limit
+    with client.governor.run_slot():
+        run = client.start_run(PUBLIC_ACTOR_ID, payload)
+        run_id = run['id']
+        # We know this run's input, so reuse checks never have to download it
+        remember_run_input(run.get('defaultKeyValueStoreId'), payload)
+        if RUN_JOURNAL_ENABLED:
+            get_run_journal().record(payload, run_id)
+        if verbose:
+            print(f"Actor run started with ID: {run_id}")
+        report_progress("run_started", f"Actor run {run_id} started", run_id=run_id)
+        
+        run = wait_for_run(run_id, timeout=timeout, verbose=verbose)
+    
+    return run if report_run_outcome(payload, run_id, run, timeout, verbose) else None
+
+
+def resume_run(payload, timeout=RUN_TIMEOUT, verbose=True):
+    """
+    Reattach to the run that an earlier, interrupted scrape started for this payload.
+    
+    A journaled run that is still going is waited on again; one that already
+    SUCCEEDED is used as is if it finished within REUSE_RUN_MAX_AGE. Returns the
+    run object (check its status: the run may have failed or still be running
+    when the timeout expired), or None if there is no run to reattach to.
+    """
+    journal = get_run_journal()
+    run_id = journal.get(payload)
+    if run_id is None:
+        return None
+    
+    client = get_client()
+    try:
+        run = client.get_run(PUBLIC_ACTOR_ID, run_id)
+    except requests.exceptions.RequestException as e:
+        response = getattr(e, 'response', None)
+        if response is not None and response.status_code == 404:
+            journal.remove(payload, run_id)
+        else:
+            print(f"⚠️  Could not look up journaled run {run_id}: {e}")
+        return None
+    
+    status = run['status']
+    if status == 'SUCCEEDED':
+        finished_at = run.get('finishedAt')
+        if not finished_at or (datetime.now(timezone.utc) - _parse_timestamp(finished_at)).total_seconds() > REUSE_RUN_MAX_AGE:
+            journal.remove(payload, run_id)
+            return None
+        print(f"🔗 Reattaching to run {run_id}, which finished after an earlier scrape stopped waiting")
+        report_progress("run_resumed", f"Reattached to finished run {run_id}", run_id=run_id, status=status)
+        return run
+    
+    if status in TERMINAL_STATUSES:
+        journal.remove(payload, run_id)
+        return None
+    
+    print(f"🔗 Reattaching to run {run_id} ({status}) started by an earlier scrape")
+    report_progress("run_resumed", f"Reattached to run {run_id} ({status})", run_id=run_id, status=status)
+    with client.governor.run_slot():
+        run = wait_for_run(run_id, timeout=timeout, verbose=verbose)
+    report_run_outcome(payload, run_id, run, timeout, verbose)
+    return run
+
+
+def _parse_timestamp(value):
+    """
+    Parse an Apify ISO-8601 timestamp such as 2024-05-01T12:00:00.000Z
+    """
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+_run_inputs = collections.OrderedDict()
+_run_inputs_lock = threading.Lock()
+
+
+def remember_run_input(store_id, run_input):
+    """
+    Remember a run's INPUT record by its key-value store id. The record never
+    changes, so it only has to be downloaded once; the oldest entries are
+    dropped past RUN_INPUT_MEMO_SIZE.
+    """
+    if not store_id:
+        return
+    with _run_inputs_lock:
+        _run_inputs[store_id] = run_input
+        _run_inputs.move_to_end(store_id)
+        while len(_run_inputs) > RUN_INPUT_MEMO_SIZE:
+            _run_inputs.popitem(last=False)
+
+
+def known_run_input(store_id):
+    """
+    The remembered INPUT record for a key-value store id, or None
+    """
+    with _run_inputs_lock:
+        return _run_inputs.get(store_id)
+
+
+def find_reusable_run(payload, max_age=REUSE_RUN_MAX_AGE, lookback=REUSE_RUN_LOOKBACK):
+    """
+    Look through the actor's recent SUCCEEDED runs for one that finished within
+    max_age seconds and was started with the same input as payload.
+    Returns that run object, or None if there is nothing to reuse.
+    Run inputs are downloaded at most once per run (see remember_run_input).
+    """
+    client = get_client()
+    try:
+        runs = client.list_runs(PUBLIC_ACTOR_ID, limit=lookback, status='SUCCEEDED')
+    except requests.exceptions.RequestException as e:
+        print(f"⚠️  Could not list recent runs: {e}")
+        return None
+    
+    now = datetime.now(timezone.utc)
+    for run in runs:
+        finished_at = run.get('finishedAt')
+        if not finished_at:
+            continue
+        if (now - _parse_timestamp(finished_at)).total_seconds() > max_age:
+            break  # Runs are listed newest first, so the rest are older still
+        
+        try:
+            if 'defaultKeyValueStoreId' not in run or 'defaultDatasetId' not in run:
+                run = client.get_run(PUBLIC_ACTOR_ID, run['id'])
+            run_input = known_run_input(run['defaultKeyValueStoreId'])
+            if run_input is None:
+                run_input = client.get_record(run['defaultKeyValueStoreId'], 'INPUT')
+                remember_run_input(run['defaultKeyValueStoreId'], run_input)
+        except requests.exceptions.RequestException:
+            continue
+        
+        if run_input_matches(payload, run_input):
+            return run
+    
+    return None
+
+
+def run_input_matches(payload, run_input):
+    """
+    Whether a run's INPUT record was started from payload. The platform may fill
+    in input defaults, so only the payload's own fields have to match.
+    """
+    return isinstance(run_input, dict) and all(run_input.get(k) == v for k, v in payload.items())
+
+
+def fetch_posts(run, empty_message, stream=False, raise_on_error=False):
+    """
+    Fetch the items of a finished run's default dataset.
+    
+    With stream=True an iterator is returned that pages through the dataset
+    lazily; otherwise the items are collected into a list. Returns None if
+    the dataset is empty or only holds an actor error object; with
+    raise_on_error=True an error object raises RunFailedError instead.
+    """
+    dataset_id = run['defaultDatasetId']
+    print(f"📊 Fetching data from dataset: {dataset_id}")
+    
+    items = get_client().iter_dataset_items(dataset_id)
+    
+    # Peek at the first two items so empty/error datasets are caught up front
+    head = list(itertools.islice(items, 2))
+    
+    if not head:
+        print("📈 Retrieved 0 items from dataset")
+        print(empty_message)
+        return None
+    
+    # Check if the data contains error objects
+    if len(head) == 1 and isinstance(head[0], dict) and "error" in head[0]:
+        print(f"❌ Actor returned error: {head[0]['error']} - {head[0].get('errorDescription', 'No description')}")
+        print("This suggests the actor cannot access Instagram data due to anti-scraping measures.")
+        if raise_on_error:
+            raise RunFailedError(f"Actor run {run['id']} returned an error: {head[0]['error']}")
+        return None
+    
+    items = itertools.chain(head, items)
+    if stream:
+        return items
+    
+    data = list(items)
+    print(f"📈 Retrieved {len(data)} items from dataset")
+    return data
+
+
+def hashtag_payload(hashtag, max_posts=None):
+    """
+    Actor input that scrapes up to max_posts posts from a hashtag page
+    """
+    if max_posts is None:
+        max_posts = MAX_POSTS
+    hashtag_url = f"https://www.instagram.com/explore/tags/{hashtag.replace('#', '')}/"
+    return {
         "directUrls": [hashtag_url],
         "resultsLimit": max_posts,
         "searchType": "hashtag",
@@ -31,6 +638,47 @@ def run_scraper_by_hashtag(hashtags_list, max_posts=None):
             "useApifyProxy": True
         }
     }
+
+
+def profile_payload(username, max_posts=None):
+    """
+    Actor input that scrapes up to max_posts posts from a user profile
+    """
+    return profiles_payload([username], max_posts)
+
+
+def profiles_payload(usernames, max_posts=None):
+    """
+    Actor input that scrapes up to max_posts posts from each of several user profiles
+    """
+    if max_posts is None:
+        max_posts = MAX_POSTS
+    # Convert usernames to full Instagram profile URLs
+    profile_urls = [f"https://www.instagram.com/{username}/" for username in usernames]
+    return {
+        "directUrls": profile_urls,
+        "resultsLimit": max_posts,
+        "searchType": "user",
+        "addParentData": False,
+        "searchLimit": max_posts,
+        "proxy": {
+            "useApifyProxy": True
+        }
+    }
+
+
+def run_scraper_by_hashtag(hashtags_list, max_posts=None, stream=False):
+    """
+    Run Instagram scraper using Apify actor for hashtag-based searches.
+    With stream=True the posts are returned as a lazy iterator.
+    """
+    if max_posts is None:
+        max_posts = MAX_POSTS
+    
+    # Select a random hashtag from the list for better variety
+    selected_hashtag = random.choice(hashtags_list)
+    payload = hashtag_payload(selected_hashtag, max_posts)
+    hashtag_url = payload["directUrls"][0]
     
     # Alternative payload if the above doesn't work
     # payload = {
@@ -44,57 +692,11 @@ def run_scraper_by_hashtag(hashtags_list, max_posts=None):
         print(f"📊 Target URL: {hashtag_url}")
         print(f"📋 Payload: {json.dumps(payload, indent=2)}")
         
-        response = requests.post(run_url, json=payload)
-        response.raise_for_status()
-        run_data = response.json()
-        run_id = run_data['data']['id']
-        print(f"Actor run started with ID: {run_id}")
-        
-        # Poll for run status
-        for attempt in range(MAX_RETRIES * 6):  # up to 3 minutes
-            status_url = f"https://api.apify.com/v2/acts/{PUBLIC_ACTOR_ID}/runs/{run_id}?token={APIFY_TOKEN}"
-            status_response = requests.get(status_url)
-            status_response.raise_for_status()
-            status_data = status_response.json()
-            status = status_data['data']['status']
-            print(f"Run status: {status}")
-            
-            if status == 'SUCCEEDED':
-                print("✅ Run completed successfully!")
-                break
-            elif status in ['FAILED', 'ABORTED']:
-                print(f"❌ Actor run failed with status: {status}")
-                print(f"Full status response: {json.dumps(status_data, indent=2)}")
-                return None
-            elif status == 'RUNNING':
-                print(f"⏳ Run is still running... (attempt {attempt + 1})")
-            else:
-                print(f"⚠️  Unexpected status: {status}")
-            
-            time.sleep(RETRY_DELAY)
-        
-        # Fetch dataset items
-        dataset_id = status_data['data']['defaultDatasetId']
-        print(f"📊 Fetching data from dataset: {dataset_id}")
-        
-        results_url = f"https://api.apify.com/v2/datasets/{dataset_id}/items?token={APIFY_TOKEN}"
-        results_response = requests.get(results_url)
-        results_response.raise_for_status()
-        data = results_response.json()
-        
-        print(f"📈 Retrieved {len(data) if data else 0} items from dataset")
-        
-        if not data:
-            print(f"❌ No data found for hashtag: {selected_hashtag}. The hashtag may not exist or have no posts.")
-            return None
-            
-        # Check if the data contains error objects
-        if len(data) == 1 and isinstance(data[0], dict) and "error" in data[0]:
-            print(f"❌ Actor returned error: {data[0]['error']} - {data[0].get('errorDescription', 'No description')}")
-            print("This suggests the actor cannot access Instagram data due to anti-scraping measures.")
-            return None
-            
-        return data
+        return scrape_payload(
+            payload,
+            f"❌ No data found for hashtag: {selected_hashtag}. The hashtag may not exist or have no posts.",
+            stream=stream
+        )
     except requests.exceptions.HTTPError as e:
         print(f"❌ HTTP error: {e}")
         print(f"Response: {e.response.text}")
@@ -104,10 +706,383 @@ def run_scraper_by_hashtag(hashtags_list, max_posts=None):
         return None
 
 
-def run_scraper_by_domain(domain):
+def forget_run_when_read(payload, run_id, items):
+    """
+    Yield a finished run's items, then drop the run from the journal once the
+    dataset has been read to the end (or the reader stopped on purpose), so
+    only runs still in flight are ever reattached
+    """
+    journal = get_run_journal()
+    try:
+        yield from items
+    except GeneratorExit:
+        journal.remove(payload, run_id)
+        raise
+    journal.remove(payload, run_id)
+
+
+def scrape_payload(payload, empty_message, stream=False, timeout=RUN_TIMEOUT, verbose=True, raise_on_failure=False):
+    """
+    Return the posts for a scrape payload, from the local result cache when a
+    fresh copy exists, otherwise from a journaled run an interrupted scrape left
+    behind, a recent identical run on Apify or a new actor run, caching the
+    dataset as it is read.
+    With stream=True the posts are returned as a lazy iterator.
+    Returns None when there are no posts; a run that fails, times out or
+    returns an actor error object also returns None, or raises RunFailedError
+    with raise_on_failure=True.
+    """
+    cache = get_result_cache() if RESULT_CACHE_ENABLED else None
+    
+    cached = cache.get(payload) if cache else None
+    if cached is not None:
+        print("💾 Serving posts from local result cache")
+        report_progress("cache_hit", "Serving posts from the local result cache")
+        return cached if stream else list(cached)
+    
+    run = resume_run(payload, timeout=timeout, verbose=verbose) if RUN_JOURNAL_ENABLED else None
+    if run is not None and run['status'] != 'SUCCEEDED':
+        # Failed, or still running and left journaled for the next attempt
+        if raise_on_failure:
+            raise RunFailedError(f"Actor run {run['id']} ended with status {run['status']}")
+        return None
+    
+    if run is None and REUSE_RECENT_RUNS:
+        run = find_reusable_run(payload)
+        if run is not None:
+            print(f"♻️  Reusing recent run {run['id']} with identical input")
+            report_progress("run_reused", f"Reusing recent run {run['id']}", run_id=run['id'])
+    
+    if run is None:
+        run = run_actor(payload, timeout=timeout, verbose=verbose)
+        if run is None:
+            if raise_on_failure:
+                raise RunFailedError("Actor run failed or did not finish in time")
+            return None
+    
+    try:
+        items = fetch_posts(run, empty_message, stream=True, raise_on_error=raise_on_failure)
+    except RunFailedError:
+        if RUN_JOURNAL_ENABLED:
+            get_run_journal().remove(payload, run['id'])
+        raise
+    if RUN_JOURNAL_ENABLED:
+        if items is None:
+            get_run_journal().remove(payload, run['id'])
+        else:
+            items = forget_run_when_read(payload, run['id'], items)
+    if items is None:
+        return None
+    
+    if cache:
+        items = cache.write_through(payload, items)
+    if stream:
+        return items
+    
+    data = list(items)
+    print(f"📈 Retrieved {len(data)} items from dataset")
+    return data
+
+
+def post_key(post):
+    """
+    Identify a post by its shortcode (falling back to the URL's last segment or id)
+    """
+    shortcode = post.get('shortCode')
+    if shortcode:
+        return shortcode
+    url = post.get('url')
+    if url:
+        return url.rstrip('/').split('/')[-1]
+    return post.get('id')
+
+
+def post_timestamp(post):
+    """
+    Epoch seconds a post was taken, from takenAtTimestamp or the ISO timestamp field
+    """
+    value = post.get('takenAtTimestamp')
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = post.get('timestamp')
+    if isinstance(value, str):
+        try:
+            return _parse_timestamp(value).timestamp()
+        except ValueError:
+            pass
+    return None
+
+
+def take_new_posts(items, known_keys, stop_after=INCREMENTAL_STOP_AFTER_KNOWN):
+    """
+    Yield posts from a newest-first profile stream until stop_after consecutive
+    posts are already known. Pinned posts can put a few known posts ahead of new
+    ones, so a single known post does not end the stream.
+    """
+    streak = 0
+    for post in items:
+        streak = known_post_streak(post, known_keys, streak)
+        if streak >= stop_after:
+            return
+        yield post
+
+
+def known_post_streak(post, known_keys, streak):
+    """
+    Length of the run of already-known posts ending at post, given the length before it
+    """
+    return streak + 1 if post_key(post) in known_keys else 0
+
+
+def merge_posts(new_posts, stored_posts):
+    """
+    Merge freshly fetched posts into stored ones (fresh copies win), newest first
+    """
+    merged = {}
+    unkeyed = []
+    for post in itertools.chain(new_posts, stored_posts):
+        key = post_key(post)
+        if key is None:
+            unkeyed.append(post)
+        elif key not in merged:
+            merged[key] = post
+    posts = list(merged.values()) + unkeyed
+    posts.sort(key=lambda post: post_timestamp(post) or 0, reverse=True)
+    return posts
+
+
+def load_profile_snapshot(username, payload):
+    """
+    Load the stored posts of a profile and narrow the payload to posts newer than them.
+    Returns (payload, stored posts, keys of the stored posts).
+    """
+    state, stored = get_profile_history().load(username)
+    known_keys = {post_key(post) for post in stored}
+    
+    if state and state.get('newest_timestamp'):
+        since = datetime.fromtimestamp(state['newest_timestamp'], timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+        payload = dict(payload, onlyPostsNewerThan=since)
+        print(f"🔁 {len(stored)} posts of @{username} stored, fetching posts newer than {since}")
+    
+    return payload, stored, known_keys
+
+
+def save_profile_snapshot(username, fetched, stored, known_keys, limit):
+    """
+    Merge freshly fetched posts into the stored snapshot, save it, and return
+    the newest `limit` posts (None if there are no posts at all)
+    """
+    new_count = sum(1 for post in fetched if post_key(post) not in known_keys)
+    metrics.inc("profile_posts_total", new_count, source="new")
+    metrics.inc("profile_posts_total", len(stored), source="stored")
+    
+    if not fetched and not stored:
+        return None
+    
+    merged = merge_posts(fetched, stored)
+    newest = max(merged, key=lambda post: post_timestamp(post) or 0)
+    get_profile_history().save(username, merged, post_timestamp(newest), post_key(newest))
+    
+    posts = merged[:limit]
+    print(f"📈 {new_count} new posts fetched, {len(posts) - min(new_count, len(posts))} served from the local snapshot")
+    return posts
+
+
+def scrape_profile_incremental(username, payload, empty_message, stream=False):
+    """
+    Scrape only the profile posts newer than the local snapshot and merge them into it.
+    
+    The actor is asked for posts newer than the newest stored one (onlyPostsNewerThan);
+    if it returns older posts anyway, the stream is abandoned once known posts appear.
+    Returns the newest resultsLimit posts of the merged history, so callers see the
+    same posts a full scrape would return. Raises RunFailedError if the actor run
+    fails or returns an error object, so a failed scrape is never mistaken for
+    "no new posts" and the snapshot is left untouched.
+    """
+    limit = payload.get('resultsLimit', MAX_POSTS)
+    payload, stored, known_keys = load_profile_snapshot(username, payload)
+    
+    items = scrape_payload(
+        payload,
+        f"📭 No new posts from @{username} since the last snapshot" if stored else empty_message,
+        stream=True,
+        raise_on_failure=True
+    )
+    
+    fetched = []
+    if items is not None:
+        try:
+            fetched = list(take_new_posts(items, known_keys))
+        finally:
+            close = getattr(items, 'close', None)
+            if close:
+                close()
+    
+    posts = save_profile_snapshot(username, fetched, stored, known_keys, limit)
+    if posts is None:
+        return None
+    return iter(posts) if stream else posts
+
+
+def add_unique_posts(posts, merged, seen):
+    """
+    Append the posts whose key is not in seen to merged (posts without a key are
+    always kept) and return how many were added
+    """
+    added = 0
+    for post in posts:
+        key = post_key(post)
+        if key is not None:
+            if key in seen:
+                continue
+            seen.add(key)
+        merged.append(post)
+        added += 1
+    return added
+
+
+def split_post_budget(max_posts, count):
+    """
+    Split a post budget as evenly as possible over count runs, e.g. 50 over 3 -> [17, 17, 16]
+    """
+    share, extra = divmod(max(1, max_posts), count)
+    return [share + (1 if i < extra else 0) for i in range(count)]
+
+
+def run_scraper_by_hashtags(hashtags_list, max_posts=None, max_workers=MAX_CONCURRENT_RUNS):
+    """
+    Scrape several hashtags at once: one actor run per hashtag, all awaited
+    concurrently, merged into a single list de-duplicated by post shortcode.
+    max_posts is the total budget, split evenly across the hashtags.
+    """
+    if max_posts is None:
+        max_posts = MAX_POSTS
+    
+    # Never more hashtags than posts, so every run gets at least one post of the budget
+    hashtags = list(dict.fromkeys(hashtags_list))[:max(1, max_posts)]
+    if not hashtags:
+        return None
+    budgets = split_post_budget(max_posts, len(hashtags))
+    
+    print(f"🔀 Scraping {len(hashtags)} hashtags concurrently ({max_posts} posts in total)")
+    
+    merged = []
+    seen = set()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(hashtags))) as executor:
+        futures = {
+            # Each worker runs in a copy of our context so progress events reach our listener
+            executor.submit(contextvars.copy_context().run, run_scraper_by_hashtag, [hashtag], budget): hashtag
+            for hashtag, budget in zip(hashtags, budgets)
+        }
+        for future in as_completed(futures):
+            hashtag = futures[future]
+            posts = future.result()
+            if not posts:
+                print(f"⚠️  No posts from {hashtag}")
+                continue
+            
+            added = add_unique_posts(posts, merged, seen)
+            print(f"✅ {hashtag}: {added} new posts ({len(posts) - added} duplicates)")
+    
+    if not merged:
+        print(f"❌ No data found for hashtags: {', '.join(hashtags)}")
+        return None
+    
+    merged = merged[:max_posts]
+    print(f"📈 Merged {len(merged)} unique posts from {len(hashtags)} hashtags")
+    return merged
+
+
+def post_owner(post):
+    """
+    Lower-cased username of the profile a post was scraped from: the profile URL
+    the actor was given (inputUrl), falling back to the post's owner
+    """
+    input_url = post.get('inputUrl')
+    if input_url and '/explore/' not in input_url:
+        return input_url.rstrip('/').split('/')[-1].lower()
+    owner = post.get('ownerUsername') or (post.get('owner') or {}).get('username')
+    return owner.lower() if owner else None
+
+
+def scrape_profile_batch(usernames, max_posts=None):
+    """
+    Scrape several profiles with a single actor run and split the dataset by owner.
+    Returns a dict mapping each username to its posts, or to None if the
+    profile returned nothing.
+    """
+    if max_posts is None:
+        max_posts = MAX_POSTS
+    
+    payload = profiles_payload(usernames, max_posts)
+    try:
+        print(f"📦 Starting one Instagram scraper run for profiles: {', '.join(usernames)}")
+        posts = scrape_payload(payload, f"❌ No data found for profiles: {', '.join(usernames)}", verbose=False)
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Error scraping profiles {', '.join(usernames)}: {e}")
+        posts = None
+    
+    by_owner = {username.lower(): [] for username in usernames}
+    for post in posts or []:
+        if 'error' in post:
+            print(f"⚠️  Actor error for {post.get('inputUrl') or post.get('url')}: {post['error']}")
+            continue
+        owner = by_owner.get(post_owner(post))
+        if owner is not None and len(owner) < max_posts:
+            owner.append(post)
+    
+    results = {}
+    for username in usernames:
+        results[username] = by_owner[username.lower()] or None
+        if results[username] is None:
+            print(f"⚠️  No posts from @{username}")
+    metrics.observe("profile_batch_size", len(usernames), buckets=COUNT_BUCKETS)
+    return results
+
+
+def run_scraper_batch(usernames, batch_size=PROFILE_BATCH_SIZE, max_posts=None, max_workers=MAX_CONCURRENT_RUNS):
+    """
+    Scrape many profiles, packing up to batch_size of them into each actor run
+    so run start-up time and minimum charges are paid once per batch, not per profile.
+    Batches run concurrently. Returns a dict mapping each username to its posts, or
+    None when its batch run failed.
+    Batched scrapes are not incremental: onlyPostsNewerThan applies to a whole run.
+    """
+    usernames = list(dict.fromkeys(username.lstrip('@') for username in usernames))
+    if not usernames:
+        return {}
+    batch_size = max(1, batch_size)
+    batches = [usernames[i:i + batch_size] for i in range(0, len(usernames), batch_size)]
+    
+    print(f"📦 Scraping {len(usernames)} profiles in {len(batches)} actor runs (up to {batch_size} per run)")
+    
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+        futures = {
+            executor.submit(contextvars.copy_context().run, scrape_profile_batch, batch, max_posts): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            try:
+                results.update(future.result())
+            except Exception as e:
+                # One broken run must not throw away the batches that did finish
+                batch = futures[future]
+                print(f"❌ Batch run for {', '.join(batch)} failed: {e}")
+                results.update((username, None) for username in batch)
+    
+    return {username: results.get(username) for username in usernames}
+
+
+def run_scraper_by_domain(domain, stream=False, hashtag_count=HASHTAG_FANOUT, use_trending=None):
     """
     Run Instagram scraper based on domain/topic (e.g., 'food', 'fashion')
-    Uses trending hashtag discovery if enabled, otherwise falls back to static hashtags
+    Uses trending hashtag discovery if enabled, otherwise falls back to static hashtags.
+    use_trending overrides USE_TRENDING_HASHTAGS for this call only.
+    The top hashtag_count hashtags are scraped concurrently and merged; with
+    hashtag_count=1 a single random hashtag is scraped (streamable).
+    The merged fan-out result is always a list: stream=True only streams with
+    hashtag_count=1, because de-duplicating across runs needs every run's posts.
     """
     if domain.lower() not in DOMAIN_HASHTAGS:
         available_domains = list(DOMAIN_HASHTAGS.keys())
@@ -117,8 +1092,11 @@ def run_scraper_by_domain(domain):
     
     print(f"🎯 Scraping domain: {domain.upper()}")
     
+    if use_trending is None:
+        use_trending = USE_TRENDING_HASHTAGS
+    
     # Use trending hashtag discovery if enabled
-    if USE_TRENDING_HASHTAGS:
+    if use_trending:
         try:
             from trending_hashtags import get_hashtags_for_domain
             hashtags = get_hashtags_for_domain(domain, use_trending=True, fallback_to_static=True)
@@ -139,84 +1117,31 @@ def run_scraper_by_domain(domain):
     
     print(f"🏷️  Using hashtags: {', '.join(hashtags[:8])}{'...' if len(hashtags) > 8 else ''}")
     
-    return run_scraper_by_hashtag(hashtags)
+    if hashtag_count > 1 and len(hashtags) > 1:
+        if stream:
+            print("ℹ️  Merging several hashtags: posts are collected into a list instead of streamed")
+        return run_scraper_by_hashtags(hashtags[:hashtag_count])
+    
+    return run_scraper_by_hashtag(hashtags, stream=stream)
 
 
-def run_scraper(username):
+def run_scraper(username, stream=False, incremental=INCREMENTAL_PROFILES):
     """
-    Original function for backward compatibility - scrapes user profiles
+    Original function for backward compatibility - scrapes user profiles.
+    With stream=True the posts are returned as a lazy iterator.
+    With incremental=True only posts newer than the local snapshot are fetched.
     """
-    run_url = f"https://api.apify.com/v2/acts/{PUBLIC_ACTOR_ID}/runs?token={APIFY_TOKEN}"
-    
-    # Convert username to full Instagram profile URL
-    profile_url = f"https://www.instagram.com/{username}/"
-    
-    payload = {
-        "directUrls": [profile_url],
-        "resultsLimit": MAX_POSTS,
-        "searchType": "user",
-        "addParentData": False,
-        "searchLimit": MAX_POSTS,
-        "proxy": {
-            "useApifyProxy": True
-        }
-    }
+    payload = profile_payload(username)
+    profile_url = payload["directUrls"][0]
     
     try:
         print(f"📱 Starting Instagram scraper for profile: {profile_url}")
         print(f"📋 Payload: {json.dumps(payload, indent=2)}")
         
-        response = requests.post(run_url, json=payload)
-        response.raise_for_status()
-        run_data = response.json()
-        run_id = run_data['data']['id']
-        print(f"Actor run started with ID: {run_id}")
-        
-        # Poll for run status
-        for attempt in range(MAX_RETRIES * 6):
-            status_url = f"https://api.apify.com/v2/acts/{PUBLIC_ACTOR_ID}/runs/{run_id}?token={APIFY_TOKEN}"
-            status_response = requests.get(status_url)
-            status_response.raise_for_status()
-            status_data = status_response.json()
-            status = status_data['data']['status']
-            print(f"Run status: {status}")
-            
-            if status == 'SUCCEEDED':
-                print("✅ Run completed successfully!")
-                break
-            elif status in ['FAILED', 'ABORTED']:
-                print(f"❌ Actor run failed with status: {status}")
-                print(f"Full status response: {json.dumps(status_data, indent=2)}")
-                return None
-            elif status == 'RUNNING':
-                print(f"⏳ Run is still running... (attempt {attempt + 1})")
-            else:
-                print(f"⚠️  Unexpected status: {status}")
-            
-            time.sleep(RETRY_DELAY)
-        
-        # Fetch dataset items
-        dataset_id = status_data['data']['defaultDatasetId']
-        print(f"📊 Fetching data from dataset: {dataset_id}")
-        
-        results_url = f"https://api.apify.com/v2/datasets/{dataset_id}/items?token={APIFY_TOKEN}"
-        results_response = requests.get(results_url)
-        results_response.raise_for_status()
-        data = results_response.json()
-        
-        print(f"📈 Retrieved {len(data) if data else 0} items from dataset")
-        
-        if not data:
-            print(f"❌ No data found for profile: {profile_url}. The profile may not exist or is private.")
-            return None
-            
-        # Check if the data contains error objects
-        if len(data) == 1 and isinstance(data[0], dict) and "error" in data[0]:
-            print(f"❌ Actor returned error: {data[0]['error']} - {data[0].get('errorDescription', 'No description')}")
-            print("This suggests the actor cannot access Instagram data due to anti-scraping measures.")
-            return None
-            
-        return data
+        empty_message = f"❌ No data found for profile: {profile_url}. The profile may not exist or is private."
+        if incremental:
+            return scrape_profile_incremental(username, payload, empty_message, stream=stream)
+        return scrape_payload(payload, empty_message, stream=stream)
     except requests.exceptions.HTTPError as e:
         print(f"❌ HTTP error: {e}")
         print(f"Response: {e.response.text}")
@@ -1,21 +1,13 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import json
 import time
 from datetime import datetime
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
 
-# Import our modules
-from apify_scraper import run_scraper, run_scraper_by_domain
-from data_cleaner import normalize_data
-from analyze_hashtags import extract_hashtags, analyze_domain_hashtags, find_trending_hashtags
-from engagement_estimator import estimate_avg_engagement
+# Import our modules (the scraper, analyzers and plotly are imported where they
+# are used, so the page renders before any of them load)
+from jobs import get_job_registry
+from instrumentation import report_progress
 from config import DOMAIN_HASHTAGS, USE_TRENDING_HASHTAGS
-from trending_hashtags import get_hashtags_for_domain
 
 # Page configuration
 st.set_page_config(
@@ -221,6 +213,8 @@ def display_metrics_cards(metrics_data):
 
 def create_hashtag_chart(hashtag_data):
     """Create an interactive hashtag frequency chart"""
+    import plotly.express as px
+    
     if not hashtag_data:
         return None
     
@@ -248,18 +242,15 @@ def create_hashtag_chart(hashtag_data):
     
     return fig
 
-def create_engagement_heatmap(engagement_df):
+def create_engagement_heatmap(time_slots):
     """Create an engagement heatmap"""
-    if engagement_df.empty:
+    import plotly.express as px
+    
+    if time_slots.empty:
         return None
     
-    # Prepare data for heatmap
-    heatmap_data = engagement_df.pivot_table(
-        values='likesCount', 
-        index='day', 
-        columns='hour', 
-        fill_value=0
-    )
+    # Dense 7x24 grid of average likes, Monday to Sunday
+    heatmap_data = time_slots.matrix('likes_mean').fillna(0)
     
     fig = px.imshow(
         heatmap_data,
@@ -279,6 +270,8 @@ def create_engagement_heatmap(engagement_df):
 
 def create_domain_distribution_chart(domain_categories):
     """Create a pie chart for domain distribution"""
+    import plotly.express as px
+    
     if not domain_categories:
         return None
     
@@ -319,47 +312,101 @@ def display_hashtag_chips(hashtags, title):
     
     st.markdown(chips_html, unsafe_allow_html=True)
 
+ANALYSIS_CACHE_TTL = 60 * 60  # Seconds analysis results are reused across reruns and sessions
+JOB_POLL_INTERVAL = 0.5       # Seconds between progress refreshes while an analysis job runs
+
+# Progress bar position reached by each stage reported from a job
+STAGE_PROGRESS = {
+    'queued': 0,
+    'discovery': 5,
+    'cache_hit': 40,
+    'run_reused': 15,
+    'run_resumed': 15,
+    'run_started': 15,
+    'run_status': 25,
+    'items_fetched': 50,
+    'normalize': 65,
+    'hashtags': 75,
+    'engagement': 90,
+    'done': 100,
+    'failed': 100,
+}
+
+@st.cache_resource
+def get_apify_client():
+    """Pooled Apify client shared by every session and rerun"""
+    import apify_scraper
+    client = apify_scraper.ApifyClient()
+    apify_scraper.set_client(client)
+    return client
+
+def scrape_posts(analysis_type, target, use_trending):
+    """Scrape the raw posts; only the analysis built from them is kept in Streamlit's cache"""
+    from apify_scraper import run_scraper, run_scraper_by_domain
+    get_apify_client()
+    if analysis_type == "Domain Analysis":
+        # Passed per call: jobs from different sessions run concurrently in worker threads
+        raw_data = run_scraper_by_domain(target, use_trending=use_trending)
+    else:
+        raw_data = run_scraper(target)
+    
+    if not raw_data:
+        # Raised rather than returned so an empty scrape is not cached by analyze_posts
+        raise ValueError("No data retrieved. Please check your input and try again.")
+    return raw_data
+
+@st.cache_data(ttl=ANALYSIS_CACHE_TTL, show_spinner=False)
+def analyze_posts(analysis_type, target, use_trending):
+    """Scrape, normalize and analyze posts once per (analysis type, target, trending flag) within the TTL"""
+    from data_cleaner import normalize_data
+    from analyze_hashtags import build_hashtag_table, extract_hashtags, analyze_domain_hashtags
+    from engagement_estimator import estimate_avg_engagement
+    from time_slots import compute_time_slots
+    
+    raw_data = scrape_posts(analysis_type, target, use_trending)
+    report_progress("normalize", f"Normalizing {len(raw_data)} posts")
+    df = normalize_data(raw_data)
+    
+    # Perform analysis (captions are scanned for hashtags only once)
+    report_progress("hashtags", "Analyzing hashtags")
+    hashtag_table = build_hashtag_table(df["caption"])
+    if analysis_type == "Domain Analysis":
+        hashtag_analysis = analyze_domain_hashtags(df["caption"], target.lower(), hashtags=hashtag_table)
+    else:
+        hashtags = extract_hashtags(df["caption"], hashtags=hashtag_table)
+        hashtag_analysis = {
+            'total_hashtags': len(hashtag_table),
+            'unique_hashtags': int(hashtag_table.nunique()),
+            'top_hashtags': hashtags,
+            'hashtag_diversity': 0
+        }
+    
+    report_progress("engagement", "Estimating engagement by time slot")
+    time_slots = compute_time_slots(df)
+    engagement_df = estimate_avg_engagement(df, slots=time_slots)
+    
+    return {
+        'df': df,
+        'hashtag_analysis': hashtag_analysis,
+        'engagement_df': engagement_df,
+        'time_slots': time_slots
+    }
+
 def run_analysis(analysis_type, target, use_trending):
-    """Run the Instagram analysis"""
+    """Run the Instagram analysis, returning (results, error)"""
+    if analysis_type != "Domain Analysis":
+        use_trending = None  # Profiles ignore it, so it must not split their cache entries
     try:
-        # Update configuration based on user choice
-        if analysis_type == "Domain Analysis":
-            import config
-            config.USE_TRENDING_HASHTAGS = use_trending
-            raw_data = run_scraper_by_domain(target)
-        else:
-            raw_data = run_scraper(target)
-        
-        if not raw_data:
-            return None, "❌ No data retrieved. Please check your input and try again."
-        
-        # Normalize data
-        df = normalize_data(raw_data)
-        
-        # Perform analysis
-        if analysis_type == "Domain Analysis":
-            hashtag_analysis = analyze_domain_hashtags(df["caption"], target.lower())
-        else:
-            hashtags = extract_hashtags(df["caption"])
-            hashtag_analysis = {
-                'total_hashtags': len([h for sublist in df["caption"].str.findall(r'#\w+') for h in sublist]),
-                'unique_hashtags': len(set([h for sublist in df["caption"].str.findall(r'#\w+') for h in sublist])),
-                'top_hashtags': hashtags,
-                'hashtag_diversity': 0
-            }
-        
-        engagement_df = estimate_avg_engagement(df)
-        
-        return {
-            'raw_data': raw_data,
-            'df': df,
-            'hashtag_analysis': hashtag_analysis,
-            'engagement_df': engagement_df
-        }, None
-        
+        return analyze_posts(analysis_type, target, use_trending), None
+    except ValueError as e:
+        return None, f"❌ {e}"
     except Exception as e:
         return None, f"❌ Error during analysis: {str(e)}"
 
+def job_progress(job):
+    """Progress bar value for a job, from the furthest stage it has reported"""
+    return max((STAGE_PROGRESS.get(stage, 0) for stage in job.stages()), default=0)
+
 def main():
     """Main Streamlit app"""
     display_header()
@@ -408,17 +455,28 @@ def main():
         # Analysis button
         if st.button("🚀 Start Analysis", type="primary", use_container_width=True):
             if target:
-                st.session_state.run_analysis = True
                 st.session_state.analysis_config = {
                     'type': analysis_type,
                     'target': target,
                     'use_trending': use_trending
                 }
+                # Analyses run in the background so this script thread (and other sessions) never block
+                job = get_job_registry().submit(
+                    run_analysis, analysis_type, target, use_trending,
+                    description=f"{analysis_type}: {target}"
+                )
+                st.session_state.analysis_job = job.id
             else:
                 st.error("Please provide a target for analysis")
+        
+        if st.button("♻️ Clear Cached Results", use_container_width=True,
+                     help="Results are reused for an hour; clear them to scrape fresh data"):
+            analyze_posts.clear()
+            st.session_state.pop('analysis_results', None)
     
     # Main content area
-    if hasattr(st.session_state, 'run_analysis') and st.session_state.run_analysis:
+    job = get_job_registry().get(st.session_state.get('analysis_job'))
+    if job is not None and not job.done:
         config = st.session_state.analysis_config
         
         # Show analysis info
@@ -429,22 +487,28 @@ def main():
         else:
             st.info(f"📱 Analyzing @{config['target']} profile")
         
-        # Progress bar
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+        # Live progress from the job's events; the page polls until the job finishes
+        latest = job.latest_event()
+        st.progress(job_progress(job))
+        st.text(latest['message'] if latest else "Starting analysis...")
+        time.sleep(JOB_POLL_INTERVAL)
+        st.rerun()
+    
+    if job is not None:
+        results, error = job.result if job.status == "succeeded" else (None, f"❌ Error during analysis: {job.error}")
+        del st.session_state.analysis_job
         
-        # Run analysis
-        with st.spinner("🔍 Analyzing Instagram data..."):
-            progress_bar.progress(25)
-            status_text.text("Fetching data from Instagram...")
-            
-            results, error = run_analysis(config['type'], config['target'], config['use_trending'])
-            
-            progress_bar.progress(100)
-            status_text.text("Analysis complete!")
-        
-        # Clear the run flag
-        st.session_state.run_analysis = False
+        # Keep the results so reruns (e.g. export clicks) show them without analyzing again
+        st.session_state.analysis_results = {
+            'config': st.session_state.analysis_config,
+            'results': results,
+            'error': error
+        }
+    
+    if 'analysis_results' in st.session_state:
+        config = st.session_state.analysis_results['config']
+        results = st.session_state.analysis_results['results']
+        error = st.session_state.analysis_results['error']
         
         if error:
             st.error(error)
@@ -483,12 +547,9 @@ def main():
             if not results['engagement_df'].empty:
                 st.markdown("### 📊 Engagement Analysis")
                 
-                # Prepare data for heatmap
-                engagement_data = results['engagement_df'].reset_index()
-                if not engagement_data.empty:
-                    fig = create_engagement_heatmap(engagement_data)
-                    if fig:
-                        st.plotly_chart(fig, use_container_width=True)
+                fig = create_engagement_heatmap(results['time_slots'])
+                if fig:
+                    st.plotly_chart(fig, use_container_width=True)
                 
                 # Best posting time
                 if not results['engagement_df'].empty:
@@ -0,0 +1,654 @@
+import asyncio
+import json
+import random
+import time
+import weakref
+from datetime import datetime, timezone
+
+from apify_scraper import (
+    PUBLIC_ACTOR_ID, APIFY_API_BASE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, TERMINAL_STATUSES,
+    WAIT_FOR_FINISH_SECS, RUN_TIMEOUT, BACKOFF_INITIAL, BACKOFF_MAX, DATASET_PAGE_SIZE,
+    REUSE_RECENT_RUNS, REUSE_RUN_MAX_AGE, REUSE_RUN_LOOKBACK, INCREMENTAL_PROFILES, INCREMENTAL_STOP_AFTER_KNOWN,
+    hashtag_payload, profile_payload, load_profile_snapshot, save_profile_snapshot, get_governor,
+    report_run_outcome, split_post_budget, run_input_matches, known_post_streak, add_unique_posts,
+    remember_run_input, known_run_input, RunFailedError,
+)
+from cache import get_result_cache, get_run_journal, RESULT_CACHE_ENABLED, RUN_JOURNAL_ENABLED
+from instrumentation import metrics, report_progress, COUNT_BUCKETS
+from config import APIFY_TOKEN, MAX_POSTS, MAX_RETRIES, RETRY_DELAY
+
+ASYNC_POOL_SIZE = 100             # Connections shared by every coroutine on the event loop
+
+
+def _import_httpx():
+    """
+    Import httpx lazily so the synchronous scraper works without it
+    """
+    try:
+        import httpx
+    except ImportError:
+        raise ImportError("httpx is required for the async scraper. Install it with: pip install httpx") from None
+    return httpx
+
+
+class AsyncApifyClient:
+    """
+    asyncio counterpart of ApifyClient. All requests go through one httpx
+    connection pool, so hundreds of runs can be awaited from a single thread.
+    Requests and actor runs share the process-wide ApiGovernor's rate budget,
+    Retry-After pauses and MAX_ACTIVE_RUNS cap with the blocking client.
+    """
+
+    def __init__(self, token=APIFY_TOKEN, base_url=APIFY_API_BASE, pool_size=ASYNC_POOL_SIZE,
+                 connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT,
+                 governor=None):
+        httpx = _import_httpx()
+        self.token = token
+        self.governor = governor or get_governor()
+        self.base_url = base_url.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.errors = httpx.HTTPError
+
+        self.session = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+        self._timeout = httpx.Timeout
+
+    async def request(self, method, path, params=None, endpoint="other", **kwargs):
+        """
+        Send an authenticated request through the governor and raise for HTTP errors.
+        429/503 responses are retried after their Retry-After delay.
+        Latency, status and response size are recorded per endpoint name.
+        """
+        params = dict(params or {})
+        params['token'] = self.token
+
+        attempt = 0
+        while True:
+            wait = self.governor.reserve()
+            if wait > 0:
+                metrics.observe("apify_throttle_seconds", wait)
+                await asyncio.sleep(wait)
+
+            start = time.perf_counter()
+            try:
+                response = await self.session.request(method, f"{self.base_url}{path}", params=params, **kwargs)
+            except self.errors:
+                metrics.inc("apify_requests_total", endpoint=endpoint, status="error")
+                raise
+            finally:
+                metrics.observe("apify_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+
+            metrics.inc("apify_requests_total", endpoint=endpoint, status=response.status_code)
+            metrics.inc("apify_bytes_downloaded_total", len(response.content), endpoint=endpoint)
+
+            delay = self.governor.retry_delay(response, attempt)
+            if delay is None:
+                break
+            attempt += 1
+            metrics.inc("apify_retries_total", endpoint=endpoint, status=response.status_code)
+            await asyncio.sleep(delay)
+
+        response.raise_for_status()
+        return response
+
+    async def start_run(self, actor_id, payload):
+        """
+        Start an actor run and return its run object
+        """
+        response = await self.request("POST", f"/acts/{actor_id}/runs", json=payload, endpoint="start_run")
+        return response.json()['data']
+
+    async def get_run(self, actor_id, run_id, wait_for_finish=0):
+        """
+        Fetch the current run object, long-polling up to wait_for_finish seconds
+        """
+        params = {}
+        timeout = None
+        if wait_for_finish:
+            params['waitForFinish'] = int(wait_for_finish)
+            timeout = self._timeout(self.read_timeout + wait_for_finish, connect=self.connect_timeout)
+        kwargs = {'timeout': timeout} if timeout else {}
+        response = await self.request("GET", f"/acts/{actor_id}/runs/{run_id}",
+                                      params=params, endpoint="get_run", **kwargs)
+        return response.json()['data']
+
+    async def list_runs(self, actor_id, limit=REUSE_RUN_LOOKBACK, status=None):
+        """
+        List the actor's most recent runs, newest first
+        """
+        params = {'desc': 1, 'limit': limit}
+        if status:
+            params['status'] = status
+        response = await self.request("GET", f"/acts/{actor_id}/runs", params=params, endpoint="list_runs")
+        return response.json()['data']['items']
+
+    async def get_record(self, store_id, key):
+        """
+        Fetch a JSON record from a key-value store (e.g. a run's INPUT)
+        """
+        response = await self.request("GET", f"/key-value-stores/{store_id}/records/{key}", endpoint="get_record")
+        return response.json()
+
+    async def iter_dataset_items(self, dataset_id, page_size=DATASET_PAGE_SIZE):
+        """
+        Yield dataset items page by page (offset/limit)
+        """
+        offset = 0
+        while True:
+            response = await self.request("GET", f"/datasets/{dataset_id}/items",
+                                          params={'offset': offset, 'limit': page_size},
+                                          endpoint="dataset_items")
+            page = response.json()
+            for item in page:
+                yield item
+            report_progress("items_fetched", f"Fetched {offset + len(page)} items", items=offset + len(page))
+            if len(page) < page_size:
+                return
+            offset += len(page)
+
+    async def aclose(self):
+        await self.session.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+# httpx connections belong to the event loop that opened them, so every loop gets its own client
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    """
+    Return the running event loop's AsyncApifyClient, creating it on first use
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = AsyncApifyClient()
+    return client
+
+
+def set_client(client):
+    """
+    Use client for every scrape on the running event loop (e.g. to point at another base URL)
+    """
+    _clients[asyncio.get_running_loop()] = client
+
+
+async def close_client():
+    """
+    Close the running event loop's client; call before the loop shuts down
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def wait_for_run(run_id, actor_id=PUBLIC_ACTOR_ID, timeout=RUN_TIMEOUT, verbose=True):
+    """
+    Wait for an actor run to reach a terminal status and return its run object.
+    Same long-poll and backoff strategy as apify_scraper.wait_for_run, but the
+    waits are asyncio.sleep calls so other runs progress in the meantime.
+    """
+    client = get_client()
+    deadline = time.monotonic() + timeout
+    delay = BACKOFF_INITIAL
+    run = None
+    polls = 0
+
+    while True:
+        remaining = deadline - time.monotonic()
+        wait = int(max(0, min(WAIT_FOR_FINISH_SECS, remaining)))
+        poll_started = time.monotonic()
+        long_polled = False
+        polls += 1
+        metrics.inc("apify_run_polls_total")
+
+        try:
+            run = await client.get_run(actor_id, run_id, wait_for_finish=wait)
+            status = run['status']
+            if verbose:
+                print(f"Run status: {status} (poll {polls})")
+            report_progress("run_status", f"Run {run_id}: {status} (poll {polls})", run_id=run_id, status=status, polls=polls)
+            if status in TERMINAL_STATUSES:
+                metrics.observe("apify_run_polls", polls, buckets=COUNT_BUCKETS)
+                return run
+            long_polled = wait > 0 and time.monotonic() - poll_started >= wait * 0.9
+        except client.errors as e:
+            response = getattr(e, 'response', None)
+            if response is not None and response.status_code < 500 and response.status_code != 429:
+                raise
+            print(f"⚠️  Transient error while polling run {run_id}: {e}")
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            metrics.observe("apify_run_polls", polls, buckets=COUNT_BUCKETS)
+            return run
+
+        if long_polled:
+            delay = BACKOFF_INITIAL
+            continue
+
+        await asyncio.sleep(min(remaining, delay / 2 + random.uniform(0, delay / 2)))
+        delay = min(delay * 2, BACKOFF_MAX)
+
+
+async def run_actor(payload, timeout=RUN_TIMEOUT, verbose=True):
+    """
+    Start an actor run for the payload, journal it and wait for it to finish.
+    Returns the run object if it SUCCEEDED, otherwise None.
+    """
+    client = get_client()
+    async with client.governor.async_run_slot():
+        run = await client.start_run(PUBLIC_ACTOR_ID, payload)
+        run_id = run['id']
+        remember_run_input(run.get('defaultKeyValueStoreId'), payload)
+        if RUN_JOURNAL_ENABLED:
+            await asyncio.to_thread(get_run_journal().record, payload, run_id)
+        if verbose:
+            print(f"Actor run started with ID: {run_id}")
+        report_progress("run_started", f"Actor run {run_id} started", run_id=run_id)
+
+        run = await wait_for_run(run_id, timeout=timeout, verbose=verbose)
+
+    return run if report_run_outcome(payload, run_id, run, timeout, verbose) else None
+
+
+async def resume_run(payload, timeout=RUN_TIMEOUT, verbose=True):
+    """
+    Reattach to the journaled run of an earlier, interrupted scrape of this
+    payload, like apify_scraper.resume_run. Returns the run object (check its
+    status) or None if there is no run to reattach to.
+    """
+    journal = get_run_journal()
+    run_id = await asyncio.to_thread(journal.get, payload)
+    if run_id is None:
+        return None
+
+    client = get_client()
+    try:
+        run = await client.get_run(PUBLIC_ACTOR_ID, run_id)
+    except client.errors as e:
+        response = getattr(e, 'response', None)
+        if response is not None and response.status_code == 404:
+            await asyncio.to_thread(journal.remove, payload, run_id)
+        else:
+            print(f"⚠️  Could not look up journaled run {run_id}: {e}")
+        return None
+
+    status = run['status']
+    if status == 'SUCCEEDED':
+        finished_at = run.get('finishedAt')
+        if not finished_at or _age_seconds(finished_at) > REUSE_RUN_MAX_AGE:
+            await asyncio.to_thread(journal.remove, payload, run_id)
+            return None
+        print(f"🔗 Reattaching to run {run_id}, which finished after an earlier scrape stopped waiting")
+        report_progress("run_resumed", f"Reattached to finished run {run_id}", run_id=run_id, status=status)
+        return run
+
+    if status in TERMINAL_STATUSES:
+        await asyncio.to_thread(journal.remove, payload, run_id)
+        return None
+
+    print(f"🔗 Reattaching to run {run_id} ({status}) started by an earlier scrape")
+    report_progress("run_resumed", f"Reattached to run {run_id} ({status})", run_id=run_id, status=status)
+    async with client.governor.async_run_slot():
+        run = await wait_for_run(run_id, timeout=timeout, verbose=verbose)
+    report_run_outcome(payload, run_id, run, timeout, verbose)
+    return run
+
+
+def _age_seconds(timestamp):
+    return (datetime.now(timezone.utc) - datetime.fromisoformat(timestamp.replace('Z', '+00:00'))).total_seconds()
+
+
+async def find_reusable_run(payload, max_age=REUSE_RUN_MAX_AGE, lookback=REUSE_RUN_LOOKBACK):
+    """
+    Return a recent SUCCEEDED run started with the same input as payload, or None.
+    Shares apify_scraper's memo of run inputs, so each INPUT record is downloaded once.
+    """
+    client = get_client()
+    try:
+        runs = await client.list_runs(PUBLIC_ACTOR_ID, limit=lookback, status='SUCCEEDED')
+    except client.errors as e:
+        print(f"⚠️  Could not list recent runs: {e}")
+        return None
+
+    for run in runs:
+        finished_at = run.get('finishedAt')
+        if not finished_at:
+            continue
+        if _age_seconds(finished_at) > max_age:
+            break  # Runs are listed newest first, so the rest are older still
+
+        try:
+            if 'defaultKeyValueStoreId' not in run or 'defaultDatasetId' not in run:
+                run = await client.get_run(PUBLIC_ACTOR_ID, run['id'])
+            run_input = known_run_input(run['defaultKeyValueStoreId'])
+            if run_input is None:
+                run_input = await client.get_record(run['defaultKeyValueStoreId'], 'INPUT')
+                remember_run_input(run['defaultKeyValueStoreId'], run_input)
+        except client.errors:
+            continue
+
+        if run_input_matches(payload, run_input):
+            return run
+
+    return None
+
+
+async def _chain(head, items):
+    for item in head:
+        yield item
+    async for item in items:
+        yield item
+
+
+async def _iterate(items):
+    for item in items:
+        yield item
+
+
+async def fetch_posts(run, empty_message, stream=False, raise_on_error=False):
+    """
+    Fetch the items of a finished run's default dataset.
+    With stream=True an async iterator is returned, otherwise a list.
+    Returns None if the dataset is empty or only holds an actor error object;
+    with raise_on_error=True an error object raises RunFailedError instead.
+    """
+    dataset_id = run['defaultDatasetId']
+    print(f"📊 Fetching data from dataset: {dataset_id}")
+
+    items = get_client().iter_dataset_items(dataset_id)
+
+    # Peek at the first two items so empty/error datasets are caught up front
+    head = []
+    async for item in items:
+        head.append(item)
+        if len(head) == 2:
+            break
+
+    if not head:
+        print("📈 Retrieved 0 items from dataset")
+        print(empty_message)
+        return None
+
+    if len(head) == 1 and isinstance(head[0], dict) and "error" in head[0]:
+        await items.aclose()
+        print(f"❌ Actor returned error: {head[0]['error']} - {head[0].get('errorDescription', 'No description')}")
+        print("This suggests the actor cannot access Instagram data due to anti-scraping measures.")
+        if raise_on_error:
+            raise RunFailedError(f"Actor run {run['id']} returned an error: {head[0]['error']}")
+        return None
+
+    items = _chain(head, items)
+    if stream:
+        return items
+
+    data = [item async for item in items]
+    print(f"📈 Retrieved {len(data)} items from dataset")
+    return data
+
+
+async def _write_through(cache, payload, items):
+    """
+    Yield items unchanged while writing them to the cache, like
+    ResultCache.write_through. Items are written a page at a time in a worker
+    thread, so the event loop never blocks on disk and memory stays bounded.
+    The entry is only committed once the stream has been read to the end.
+    """
+    writer = await asyncio.to_thread(cache.open_writer, payload)
+    committed = False
+    page = []
+    try:
+        async for item in items:
+            page.append(item)
+            yield item
+            if len(page) >= DATASET_PAGE_SIZE:
+                await asyncio.to_thread(writer.write, page)
+                page = []
+        await asyncio.to_thread(writer.write, page)
+        await asyncio.to_thread(writer.commit)
+        committed = True
+    finally:
+        if not committed:
+            await asyncio.to_thread(writer.abort)
+
+
+async def _forget_run_when_read(payload, run_id, items):
+    """
+    Yield a finished run's items, then drop it from the journal, like apify_scraper.forget_run_when_read
+    """
+    journal = get_run_journal()
+    try:
+        async for item in items:
+            yield item
+    except GeneratorExit:
+        await asyncio.to_thread(journal.remove, payload, run_id)
+        raise
+    await asyncio.to_thread(journal.remove, payload, run_id)
+
+
+async def scrape_payload(payload, empty_message, stream=False, timeout=RUN_TIMEOUT, verbose=True,
+                         raise_on_failure=False):
+    """
+    Return the posts for a scrape payload from the local result cache, a
+    journaled run, a recent identical run or a new actor run, like
+    apify_scraper.scrape_payload.
+    With stream=True the posts are returned as an async iterator.
+    The disk caches and run journal are used from a worker thread, never on the event loop.
+    """
+    cache = get_result_cache() if RESULT_CACHE_ENABLED else None
+
+    cached = await asyncio.to_thread(cache.get, payload) if cache else None
+    if cached is not None:
+        print("💾 Serving posts from local result cache")
+        report_progress("cache_hit", "Serving posts from the local result cache")
+        # Cached entries are at most one dataset, so they are decompressed in one go off the loop
+        cached = await asyncio.to_thread(list, cached)
+        return _iterate(cached) if stream else cached
+
+    run = await resume_run(payload, timeout=timeout, verbose=verbose) if RUN_JOURNAL_ENABLED else None
+    if run is not None and run['status'] != 'SUCCEEDED':
+        # Failed, or still running and left journaled for the next attempt
+        if raise_on_failure:
+            raise RunFailedError(f"Actor run {run['id']} ended with status {run['status']}")
+        return None
+
+    if run is None and REUSE_RECENT_RUNS:
+        run = await find_reusable_run(payload)
+        if run is not None:
+            print(f"♻️  Reusing recent run {run['id']} with identical input")
+            report_progress("run_reused", f"Reusing recent run {run['id']}", run_id=run['id'])
+
+    if run is None:
+        run = await run_actor(payload, timeout=timeout, verbose=verbose)
+        if run is None:
+            if raise_on_failure:
+                raise RunFailedError("Actor run failed or did not finish in time")
+            return None
+
+    try:
+        items = await fetch_posts(run, empty_message, stream=True, raise_on_error=raise_on_failure)
+    except RunFailedError:
+        if RUN_JOURNAL_ENABLED:
+            await asyncio.to_thread(get_run_journal().remove, payload, run['id'])
+        raise
+    if RUN_JOURNAL_ENABLED:
+        if items is None:
+            await asyncio.to_thread(get_run_journal().remove, payload, run['id'])
+        else:
+            items = _forget_run_when_read(payload, run['id'], items)
+    if items is None:
+        return None
+
+    if cache:
+        items = _write_through(cache, payload, items)
+    if stream:
+        return items
+
+    data = [item async for item in items]
+    print(f"📈 Retrieved {len(data)} items from dataset")
+    return data
+
+
+async def scrape_profile_incremental(username, payload, empty_message):
+    """
+    Scrape only the profile posts newer than the local snapshot and merge them
+    into it, like apify_scraper.scrape_profile_incremental (including raising
+    RunFailedError when the actor run fails)
+    """
+    limit = payload.get('resultsLimit', MAX_POSTS)
+    payload, stored, known_keys = await asyncio.to_thread(load_profile_snapshot, username, payload)
+
+    items = await scrape_payload(
+        payload,
+        f"📭 No new posts from @{username} since the last snapshot" if stored else empty_message,
+        stream=True,
+        raise_on_failure=True
+    )
+
+    fetched = []
+    if items is not None:
+        # Same stopping rule as apify_scraper.take_new_posts
+        streak = 0
+        try:
+            async for post in items:
+                streak = known_post_streak(post, known_keys, streak)
+                if streak >= INCREMENTAL_STOP_AFTER_KNOWN:
+                    break
+                fetched.append(post)
+        finally:
+            await items.aclose()
+
+    return await asyncio.to_thread(save_profile_snapshot, username, fetched, stored, known_keys, limit)
+
+
+async def run_scraper(username, incremental=INCREMENTAL_PROFILES):
+    """
+    Async version of apify_scraper.run_scraper: the profile's posts as a list, or None
+    """
+    payload = profile_payload(username)
+    profile_url = payload["directUrls"][0]
+
+    try:
+        print(f"📱 Starting Instagram scraper for profile: {profile_url}")
+        print(f"📋 Payload: {json.dumps(payload, indent=2)}")
+
+        empty_message = f"❌ No data found for profile: {profile_url}. The profile may not exist or is private."
+        if incremental:
+            return await scrape_profile_incremental(username, payload, empty_message)
+        return await scrape_payload(payload, empty_message)
+    except Exception as e:
+        response = getattr(e, 'response', None)
+        if response is not None:
+            print(f"❌ HTTP error: {e}")
+            print(f"Response: {response.text}")
+        else:
+            print(f"❌ Error running scraper: {e}")
+        return None
+
+
+async def run_scraper_by_hashtag(hashtags_list, max_posts=None):
+    """
+    Async version of apify_scraper.run_scraper_by_hashtag: posts of one randomly
+    chosen hashtag as a list, or None
+    """
+    selected_hashtag = random.choice(hashtags_list)
+    payload = hashtag_payload(selected_hashtag, max_posts)
+
+    try:
+        print(f"🔍 Starting Instagram scraper for hashtag: {selected_hashtag}")
+        print(f"📊 Target URL: {payload['directUrls'][0]}")
+        print(f"📋 Payload: {json.dumps(payload, indent=2)}")
+
+        return await scrape_payload(
+            payload,
+            f"❌ No data found for hashtag: {selected_hashtag}. The hashtag may not exist or have no posts."
+        )
+    except Exception as e:
+        response = getattr(e, 'response', None)
+        if response is not None:
+            print(f"❌ HTTP error: {e}")
+            print(f"Response: {response.text}")
+        else:
+            print(f"❌ Error running scraper: {e}")
+        return None
+
+
+async def run_scraper_by_hashtags(hashtags_list, max_posts=None):
+    """
+    Scrape several hashtags concurrently on the event loop and merge the posts,
+    de-duplicated by shortcode, like apify_scraper.run_scraper_by_hashtags.
+    The number of runs in flight is bounded by the governor's MAX_ACTIVE_RUNS.
+    """
+    if max_posts is None:
+        max_posts = MAX_POSTS
+
+    hashtags = list(dict.fromkeys(hashtags_list))[:max(1, max_posts)]
+    if not hashtags:
+        return None
+    budgets = split_post_budget(max_posts, len(hashtags))
+
+    print(f"🔀 Scraping {len(hashtags)} hashtags concurrently ({max_posts} posts in total)")
+
+    async def scrape(hashtag, budget):
+        return hashtag, await run_scraper_by_hashtag([hashtag], budget)
+
+    merged = []
+    seen = set()
+    for finished in asyncio.as_completed([scrape(hashtag, budget) for hashtag, budget in zip(hashtags, budgets)]):
+        hashtag, posts = await finished
+        if not posts:
+            print(f"⚠️  No posts from {hashtag}")
+            continue
+
+        added = add_unique_posts(posts, merged, seen)
+        print(f"✅ {hashtag}: {added} new posts ({len(posts) - added} duplicates)")
+
+    if not merged:
+        print(f"❌ No data found for hashtags: {', '.join(hashtags)}")
+        return None
+
+    merged = merged[:max_posts]
+    print(f"📈 Merged {len(merged)} unique posts from {len(hashtags)} hashtags")
+    return merged
+
+
+async def scrape_hashtags_from_tag(hashtag, max_posts=20, rate_limiter=None):
+    """
+    Async version of trending_hashtags.scrape_hashtags_from_tag: hashtag counts
+    from a small sample of posts, or {} on failure. A rate_limiter delays the
+    run start with asyncio.sleep instead of blocking the thread.
+    """
+    from trending_hashtags import count_caption_hashtags
+
+    try:
+        payload = hashtag_payload(hashtag, max_posts)
+
+        if rate_limiter is not None:
+            wait = rate_limiter.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+        data = await scrape_payload(
+            payload,
+            f"⚠️  Sample from {hashtag} returned no posts",
+            timeout=MAX_RETRIES * 2 * RETRY_DELAY,
+            verbose=False
+        )
+        if data is None:
+            print(f"⚠️  Sample from {hashtag} failed")
+            return {}
+
+        return count_caption_hashtags(data)
+
+    except Exception as e:
+        print(f"⚠️  Error sampling {hashtag}: {e}")
+        return {}
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Batch mode: analyze many Instagram profiles and domains in one process.
+
+Targets are read from a file (one username or domain per line, # for comments),
+scraped and analyzed by a bounded pool of workers, and each result is written to
+<output>/<target>.json. Progress is checkpointed so an interrupted batch resumes
+where it left off. With --profile-batch K, profiles are scraped K per actor run.
+
+    python batch.py targets.txt --workers 4 --output batch_results
+    python batch.py accounts.txt --profile-batch 20
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from apify_scraper import run_scraper, run_scraper_by_domain, scrape_profile_batch
+from data_cleaner import normalize_data
+from analyze_hashtags import build_hashtag_table, extract_hashtags, analyze_domain_hashtags, find_trending_hashtags
+from engagement_estimator import estimate_avg_engagement
+from cache import write_json_atomic
+from post_store import append_posts
+from config import DOMAIN_HASHTAGS
+
+DEFAULT_WORKERS = 4
+DEFAULT_PROFILE_BATCH = 1  # Profiles per actor run (1 = one incremental run per profile)
+DEFAULT_OUTPUT_DIR = "batch_results"
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+def read_targets(path):
+    """
+    Read targets from a file, skipping blank lines, comments and duplicates
+    """
+    targets = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            target = line.split("#", 1)[0].strip().lstrip("@")
+            if target and target not in targets:
+                targets.append(target)
+    return targets
+
+
+def output_path(output_dir, target):
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", target)
+    return os.path.join(output_dir, f"{safe_name}.json")
+
+
+def analyze_target(target, store=False, compact=False, raw_data=None, use_trending=None):
+    """
+    Scrape and analyze one domain or profile, returning a JSON-serializable result.
+    Posts that were already scraped can be passed as raw_data. use_trending picks
+    trending or static hashtags for domains (None keeps the configured default).
+    """
+    is_domain = target.lower() in DOMAIN_HASHTAGS
+    started = time.perf_counter()
+
+    if raw_data is None and is_domain:
+        raw_data = run_scraper_by_domain(target.lower(), stream=True, use_trending=use_trending)
+    elif raw_data is None:
+        raw_data = run_scraper(target, stream=True)
+
+    if not raw_data:
+        raise ValueError("No data retrieved")
+
+    df = normalize_data(raw_data, compact=compact)
+    if store:
+        append_posts(df, target, "domain" if is_domain else "profile")
+    hashtag_table = build_hashtag_table(df["caption"])
+
+    result = {
+        "target": target,
+        "type": "domain" if is_domain else "profile",
+        "analyzed_at": datetime.now(timezone.utc).isoformat(),
+        "posts": len(df),
+    }
+
+    if is_domain:
+        result["hashtag_analysis"] = analyze_domain_hashtags(df["caption"], target.lower(), hashtags=hashtag_table)
+        result["trending_hashtags"] = find_trending_hashtags(df["caption"], min_frequency=2, hashtags=hashtag_table)
+    else:
+        result["top_hashtags"] = extract_hashtags(df["caption"], hashtags=hashtag_table)
+
+    engagement_df = estimate_avg_engagement(df)
+    result["engagement"] = engagement_df.reset_index().to_dict("records")
+    if not engagement_df.empty:
+        best_row = engagement_df.iloc[0]
+        result["best_time"] = {
+            "day": best_row.name[0],
+            "hour": int(best_row.name[1]),
+            "avg_likes": float(best_row["likesCount"]),
+        }
+
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def analyze_targets(targets, store=False, compact=False, use_trending=None):
+    """
+    Analyze targets one after another, returning (target, result, error) for each
+    """
+    outcomes = []
+    for target in targets:
+        try:
+            outcomes.append((target, analyze_target(target, store, compact, use_trending=use_trending), None))
+        except Exception as e:
+            outcomes.append((target, None, e))
+    return outcomes
+
+
+def analyze_profile_batch(usernames, store=False, compact=False):
+    """
+    Scrape several profiles with one actor run, then analyze each of them.
+    Returns (target, result, error) for each username.
+    """
+    try:
+        posts_by_profile = scrape_profile_batch(usernames)
+    except Exception as e:
+        # One broken run must not stop the rest of the batch: every profile in it fails with the error
+        return [(username, None, e) for username in usernames]
+
+    outcomes = []
+    for username in usernames:
+        try:
+            posts = posts_by_profile.pop(username)
+            if not posts:
+                raise ValueError("No data retrieved")
+            outcomes.append((username, analyze_target(username, store, compact, raw_data=posts), None))
+        except Exception as e:
+            outcomes.append((username, None, e))
+    return outcomes
+
+
+class Checkpoint:
+    """
+    Tracks completed and failed targets in <output>/checkpoint.json
+    """
+
+    def __init__(self, path, resume=True):
+        self.path = path
+        self.completed = set()
+        self.failed = {}
+        self._lock = threading.Lock()
+        if resume and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.completed = set(data.get("completed", []))
+            self.failed = data.get("failed", {})
+
+    def _save(self):
+        write_json_atomic(self.path, {"completed": sorted(self.completed), "failed": self.failed})
+
+    def mark_completed(self, target):
+        with self._lock:
+            self.completed.add(target)
+            self.failed.pop(target, None)
+            self._save()
+
+    def mark_failed(self, target, error):
+        with self._lock:
+            self.failed[target] = error
+            self._save()
+
+
+def run_batch(targets, output_dir=DEFAULT_OUTPUT_DIR, workers=DEFAULT_WORKERS, resume=True, store=False,
+              compact=False, profile_batch=DEFAULT_PROFILE_BATCH, use_trending=None):
+    """
+    Analyze every target with a bounded worker pool; a failing target never stops the others.
+    With profile_batch > 1, profiles are scraped that many per actor run.
+    use_trending is passed down to every domain scrape (None keeps the configured default).
+    Returns (completed, failed) counts for this invocation.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint = Checkpoint(os.path.join(output_dir, CHECKPOINT_FILE), resume=resume)
+
+    pending = [target for target in targets if target not in checkpoint.completed]
+    skipped = len(targets) - len(pending)
+    if skipped:
+        print(f"⏭️  Skipping {skipped} targets already completed (checkpoint)")
+    print(f"🚀 Analyzing {len(pending)} targets with {workers} workers...")
+
+    singles = pending
+    profile_batches = []
+    if profile_batch > 1:
+        profiles = [target for target in pending if target.lower() not in DOMAIN_HASHTAGS]
+        singles = [target for target in pending if target.lower() in DOMAIN_HASHTAGS]
+        profile_batches = [profiles[i:i + profile_batch] for i in range(0, len(profiles), profile_batch)]
+        if profiles:
+            print(f"📦 Scraping {len(profiles)} profiles in {len(profile_batches)} batched actor runs")
+
+    completed = failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(analyze_targets, [target], store, compact, use_trending) for target in singles]
+        futures += [executor.submit(analyze_profile_batch, batch, store, compact) for batch in profile_batches]
+        for future in as_completed(futures):
+            for target, result, error in future.result():
+                if error is None:
+                    write_json_atomic(output_path(output_dir, target), result)
+                    checkpoint.mark_completed(target)
+                    completed += 1
+                    print(f"✅ [{completed + failed}/{len(pending)}] {target}: {result['posts']} posts in {result['seconds']}s")
+                else:
+                    checkpoint.mark_failed(target, str(error))
+                    failed += 1
+                    print(f"❌ [{completed + failed}/{len(pending)}] {target}: {error}")
+
+    return completed, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze many Instagram profiles/domains in one process")
+    parser.add_argument("targets_file", help="File with one username or domain per line")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Targets analyzed concurrently")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_DIR, help="Directory for per-target results")
+    parser.add_argument("--static", action="store_true", help="Use static hashtags for domains (no trending discovery)")
+    parser.add_argument("--store", action="store_true", help="Append normalized posts to the Parquet post store")
+    parser.add_argument("--compact", action="store_true", help="Keep posts in the compact DataFrame layout")
+    parser.add_argument("--profile-batch", type=int, default=DEFAULT_PROFILE_BATCH, metavar="K",
+                        help="Scrape profiles K per actor run instead of one run each (not incremental)")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore the checkpoint and analyze every target")
+    args = parser.parse_args(argv)
+
+    targets = read_targets(args.targets_file)
+    if not targets:
+        print("❌ No targets found in", args.targets_file)
+        return 1
+
+    completed, failed = run_batch(targets, args.output, args.workers, resume=not args.no_resume,
+                                  store=args.store, compact=args.compact, profile_batch=args.profile_batch,
+                                  use_trending=False if args.static else None)
+    print(f"\n📊 Batch finished: {completed} succeeded, {failed} failed. Results in {args.output}/")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+"""
+Offline benchmarks for the scrape -> normalize -> analyze pipeline.
+
+Run from the repository root, e.g. ``python -m benchmarks.run_benchmarks``.
+"""
@@ -0,0 +1,101 @@
+"""
+Benchmark of normalize_data: the direct field-extraction fast path against the
+chunked json_normalize path it replaced.
+
+Synthetic posts are generated in memory up front so only normalization is timed.
+Both paths are checked to produce the same DataFrame.
+
+    python -m benchmarks.bench_normalize --sizes 10000 100000 --repeat 3
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from data_cleaner import normalize_data
+from benchmarks.synthetic import generate_posts
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+PATHS = [("json_normalize", False), ("fast path", True)]
+
+
+def time_normalize(posts, fast, repeat, trace_memory):
+    """
+    Best wall-clock time over `repeat` runs and the peak traced memory of one run
+    """
+    best = None
+    peak = None
+    for attempt in range(repeat):
+        if trace_memory and attempt == 0:
+            tracemalloc.start()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            df = normalize_data(posts, fast=fast)
+        elapsed = time.perf_counter() - start
+        if trace_memory and attempt == 0:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        best = elapsed if best is None else min(best, elapsed)
+    return df, best, peak
+
+
+def run(sizes, repeat=3, trace_memory=True):
+    results = []
+    for size in sizes:
+        print(f"⏱️  Normalizing {size:,} posts...")
+        posts = list(generate_posts(size, seed=size))
+        frames = {}
+        result = {"posts": size}
+        for name, fast in PATHS:
+            frames[name], seconds, peak = time_normalize(posts, fast, repeat, trace_memory)
+            result[name] = {"seconds": round(seconds, 4), "peak_bytes": peak}
+
+        # Timestamps are never missing in synthetic posts, so the frames must match exactly
+        pd.testing.assert_frame_equal(frames["json_normalize"], frames["fast path"])
+        result["speedup"] = round(result["json_normalize"]["seconds"] / max(result["fast path"]["seconds"], 1e-9), 2)
+        results.append(result)
+    return results
+
+
+def _format_bytes(value):
+    if value is None:
+        return "-"
+    return f"{value / (1024 * 1024):.1f} MiB"
+
+
+def print_report(results):
+    print(f"\n{'posts':>10}  {'path':<15} {'seconds':>9}  {'peak':>10}")
+    for result in results:
+        for name, _ in PATHS:
+            stats = result[name]
+            print(f"{result['posts']:>10,}  {name:<15} {stats['seconds']:>9.3f}  {_format_bytes(stats['peak_bytes']):>10}")
+        print(f"{'':>10}  {'speedup':<15} {result['speedup']:>8.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the normalize_data fast path with json_normalize")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Corpus sizes to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per path; the best time is reported")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Skip peak memory tracing")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON to PATH")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, max(1, args.repeat), trace_memory=not args.no_tracemalloc)
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"📝 Results written to {args.json}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Startup-time benchmark for the CLI entry point.
+
+Runs each command in a fresh interpreter several times and reports the best and
+median wall-clock time, next to a bare `python -c pass` baseline, plus which
+heavy modules (pandas, numpy, requests, plotly) the command imported.
+
+    python -m benchmarks.bench_startup --repeat 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["pandas", "numpy", "requests", "plotly"]
+
+# Each command runs main.py in-process so the heavy modules it loaded can be listed afterwards
+_RUN_MAIN = (
+    "import contextlib, io, runpy, sys\n"
+    "sys.argv = ['main.py'] + {args!r}\n"
+    "with contextlib.redirect_stdout(io.StringIO()):\n"
+    "    try:\n"
+    "        runpy.run_path('main.py', run_name='__main__')\n"
+    "    except SystemExit:\n"
+    "        pass\n"
+    "print(','.join(m for m in {heavy!r} if m in sys.modules))\n"
+)
+
+COMMANDS = {
+    "python -c pass": ["-c", "pass"],
+    "main.py --help": ["-c", _RUN_MAIN.format(args=["--help"], heavy=HEAVY_MODULES)],
+    "main.py <bad option>": ["-c", _RUN_MAIN.format(args=["food", "--bogus"], heavy=HEAVY_MODULES)],
+}
+
+
+def time_command(args, repeat):
+    """
+    Wall-clock seconds of `repeat` fresh interpreter runs, and the last run's output
+    """
+    timings = []
+    output = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable] + args, cwd=REPO_DIR, capture_output=True, text=True)
+        timings.append(time.perf_counter() - start)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Command failed: {completed.stderr.strip()}")
+        output = completed.stdout.strip()
+    return timings, output
+
+
+def run(repeat):
+    results = []
+    for name, args in COMMANDS.items():
+        print(f"⏱️  Timing {name}...")
+        timings, output = time_command(args, repeat)
+        results.append({
+            "command": name,
+            "best_seconds": round(min(timings), 4),
+            "median_seconds": round(statistics.median(timings), 4),
+            "heavy_modules": [module for module in output.split(",") if module],
+        })
+    return results
+
+
+def print_report(results):
+    baseline = results[0]["median_seconds"]
+    print(f"\n{'command':<22} {'best':>8} {'median':>8} {'over baseline':>14}  heavy modules")
+    for result in results:
+        overhead = result["median_seconds"] - baseline
+        print(f"{result['command']:<22} {result['best_seconds']:>7.3f}s {result['median_seconds']:>7.3f}s "
+              f"{overhead:>13.3f}s  {', '.join(result['heavy_modules']) or '-'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure CLI startup time in fresh interpreters")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per command")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON to PATH")
+    args = parser.parse_args(argv)
+
+    results = run(max(1, args.repeat))
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"📝 Results written to {args.json}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
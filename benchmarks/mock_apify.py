@@ -0,0 +1,296 @@
+"""
+Local stand-in for the Apify run / run-status / dataset endpoints used by apify_scraper
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from urllib.request import urlopen
+
+from benchmarks.synthetic import generate_post, generate_posts
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # Accept hundreds of simultaneous connections (the default backlog is 5)
+
+
+def _iso_now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+class MockApifyServer:
+    """
+    Threaded HTTP server that emulates the Apify v2 API.
+
+    Every request is delayed by `latency` seconds, every run takes `run_duration`
+    seconds to succeed, and each run's dataset holds `resultsLimit` synthetic posts
+    generated on demand page by page. With `rate_limit`, requests beyond that many
+    per second are answered with 429 and a Retry-After header, like the real API. Use as a context manager; `base_url` is the
+    value to pass to ApifyClient(base_url=...).
+    """
+
+    def __init__(self, latency=0.02, run_duration=0.5, host="127.0.0.1", port=0, rate_limit=None):
+        self.latency = latency
+        self.run_duration = run_duration
+        self.rate_limit = rate_limit
+        self.runs = {}
+        self.request_counts = {}
+        self._lock = threading.Lock()
+        self._window = None
+        self._window_requests = 0
+        self._httpd = _Server((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v2"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-apify", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _count(self, endpoint):
+        with self._lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+    def _rate_limited(self):
+        """
+        Count a request against the current one-second window; True if it is over the limit
+        """
+        if not self.rate_limit:
+            return False
+        with self._lock:
+            window = int(time.monotonic())
+            if window != self._window:
+                self._window, self._window_requests = window, 0
+            self._window_requests += 1
+            limited = self._window_requests > self.rate_limit
+        if limited:
+            self._count("rate_limited")
+        return limited
+
+    def _create_run(self, actor_id, run_input):
+        run_id = uuid.uuid4().hex[:17]
+        run = {
+            "id": run_id,
+            "actId": actor_id,
+            "status": "RUNNING",
+            "startedAt": _iso_now(),
+            "finishedAt": None,
+            "defaultDatasetId": f"ds-{run_id}",
+            "defaultKeyValueStoreId": f"kv-{run_id}",
+            "_started": time.monotonic(),
+            "_input": run_input,
+            "_items": int(run_input.get("resultsLimit", 50)),
+            "_seed": len(self.runs),
+            "_urls": list(run_input.get("directUrls") or []),
+        }
+        # Profile runs return resultsLimit posts per profile URL, one profile after another
+        if run_input.get("searchType") == "user" and len(run["_urls"]) > 1:
+            run["_items"] *= len(run["_urls"])
+        with self._lock:
+            self.runs[run_id] = run
+        return run
+
+    def _refresh(self, run):
+        if run["status"] == "RUNNING" and time.monotonic() - run["_started"] >= self.run_duration:
+            run["status"] = "SUCCEEDED"
+            run["finishedAt"] = _iso_now()
+        return run
+
+    def _generate(self, run, offset, count):
+        """
+        Posts offset..offset+count of a run's dataset; profile posts carry their owner and inputUrl
+        """
+        if run["_input"].get("searchType") != "user" or not run["_urls"]:
+            return list(generate_posts(count, seed=run["_seed"], offset=offset))
+        per_url = max(1, run["_items"] // len(run["_urls"]))
+        posts = []
+        for index in range(offset, offset + count):
+            url = run["_urls"][min(index // per_url, len(run["_urls"]) - 1)]
+            post = generate_post(index, seed=run["_seed"], owner=url.rstrip("/").split("/")[-1])
+            post["inputUrl"] = url
+            posts.append(post)
+        return posts
+
+    def _public(self, run):
+        return {key: value for key, value in run.items() if not key.startswith("_")}
+
+    def _find(self, key, value):
+        with self._lock:
+            for run in self.runs.values():
+                if run[key] == value:
+                    return run
+        return None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, headers=None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _throttled(self):
+                if not server._rate_limited():
+                    return False
+                self._send(429, {"error": {"type": "rate-limit-exceeded", "message": "Rate limit exceeded"}},
+                           headers={"Retry-After": "1"})
+                return True
+
+            def do_POST(self):
+                time.sleep(server.latency)
+                if self._throttled():
+                    return
+                parts = urlparse(self.path).path.strip("/").split("/")
+                # /v2/acts/{actor}/runs
+                if len(parts) == 4 and parts[1] == "acts" and parts[3] == "runs":
+                    server._count("start_run")
+                    length = int(self.headers.get("Content-Length", 0))
+                    run_input = json.loads(self.rfile.read(length) or b"{}")
+                    run = server._create_run(parts[2], run_input)
+                    return self._send(201, {"data": server._public(run)})
+                self._send(404, {"error": {"message": "not found"}})
+
+            def do_GET(self):
+                time.sleep(server.latency)
+                url = urlparse(self.path)
+                parts = url.path.strip("/").split("/")
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+                # /_stats: request counts per endpoint (not part of the Apify API)
+                if parts == ["_stats"]:
+                    with server._lock:
+                        return self._send(200, dict(server.request_counts))
+
+                if self._throttled():
+                    return
+
+                # /v2/acts/{actor}/runs/{run_id}
+                if len(parts) == 5 and parts[1] == "acts" and parts[3] == "runs":
+                    server._count("get_run")
+                    run = server.runs.get(parts[4])
+                    if run is None:
+                        return self._send(404, {"error": {"message": "run not found"}})
+                    deadline = time.monotonic() + float(query.get("waitForFinish", 0))
+                    while server._refresh(run)["status"] == "RUNNING" and time.monotonic() < deadline:
+                        time.sleep(0.01)
+                    return self._send(200, {"data": server._public(run)})
+
+                # /v2/acts/{actor}/runs?desc=1&limit=N&status=...
+                if len(parts) == 4 and parts[1] == "acts" and parts[3] == "runs":
+                    server._count("list_runs")
+                    with server._lock:
+                        runs = [server._refresh(run) for run in server.runs.values()]
+                    if "status" in query:
+                        runs = [run for run in runs if run["status"] == query["status"]]
+                    runs.sort(key=lambda run: run["startedAt"], reverse=query.get("desc") == "1")
+                    items = [server._public(run) for run in runs[:int(query.get("limit", 1000))]]
+                    return self._send(200, {"data": {"items": items, "total": len(runs)}})
+
+                # /v2/key-value-stores/{store_id}/records/INPUT
+                if len(parts) == 5 and parts[1] == "key-value-stores" and parts[4] == "INPUT":
+                    server._count("get_record")
+                    run = server._find("defaultKeyValueStoreId", parts[2])
+                    if run is None:
+                        return self._send(404, {"error": {"message": "record not found"}})
+                    return self._send(200, run["_input"])
+
+                # /v2/datasets/{dataset_id}/items?offset=&limit=
+                if len(parts) == 4 and parts[1] == "datasets" and parts[3] == "items":
+                    server._count("dataset_items")
+                    run = server._find("defaultDatasetId", parts[2])
+                    if run is None:
+                        return self._send(404, {"error": {"message": "dataset not found"}})
+                    offset = int(query.get("offset", 0))
+                    limit = int(query.get("limit", run["_items"]))
+                    count = max(0, min(limit, run["_items"] - offset))
+                    return self._send(200, server._generate(run, offset, count))
+
+                self._send(404, {"error": {"message": "not found"}})
+
+        return Handler
+
+
+def _serve(host, port, latency, run_duration, rate_limit, ready):
+    server = MockApifyServer(latency=latency, run_duration=run_duration, host=host, port=port, rate_limit=rate_limit)
+    ready.set()
+    server._httpd.serve_forever()
+
+
+@contextlib.contextmanager
+def serve_in_subprocess(latency=0.02, run_duration=0.5, host="127.0.0.1", rate_limit=None):
+    """
+    Run the mock server in a separate process so generating and encoding the
+    synthetic datasets does not compete with the code under test for the GIL.
+    Yields the base URL; request counts are available from <host>/_stats.
+    """
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        port = sock.getsockname()[1]
+
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(target=_serve, args=(host, port, latency, run_duration, rate_limit, ready), daemon=True)
+    process.start()
+    ready.wait(10)
+    try:
+        yield f"http://{host}:{port}/v2"
+    finally:
+        process.terminate()
+        process.join()
+
+
+def fetch_stats(base_url):
+    """
+    Request counts per endpoint from a running mock server
+    """
+    with urlopen(base_url.rsplit("/v2", 1)[0] + "/_stats") as response:
+        return json.loads(response.read())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a mock Apify API for offline benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.02, help="Delay added to every request (seconds)")
+    parser.add_argument("--run-duration", type=float, default=0.5, help="Time until a run succeeds (seconds)")
+    parser.add_argument("--rate-limit", type=int, help="Requests per second before answering 429")
+    args = parser.parse_args()
+
+    mock = MockApifyServer(latency=args.latency, run_duration=args.run_duration, host=args.host, port=args.port,
+                           rate_limit=args.rate_limit)
+    print(f"🧪 Mock Apify API listening on {mock.base_url}")
+    try:
+        mock._httpd.serve_forever()
+    except KeyboardInterrupt:
+        mock.stop()
@@ -0,0 +1,142 @@
+"""
+Offline throughput benchmark for the scrape -> normalize -> analyze pipeline.
+
+Starts a local mock of the Apify API in a subprocess, serves synthetic corpora of the requested
+sizes through it and times each stage of the pipeline, reporting wall-clock time
+and peak traced memory per stage plus end-to-end totals.
+
+    python -m benchmarks.run_benchmarks --sizes 100 10000 1000000 --latency 0.01
+"""
+
+import argparse
+import json
+import resource
+import sys
+import time
+import tracemalloc
+
+import apify_scraper
+from analyze_hashtags import build_hashtag_table, analyze_domain_hashtags, find_trending_hashtags
+from analyze_schedule import analyze_posting_schedule
+from data_cleaner import normalize_data
+from engagement_estimator import estimate_avg_engagement
+from time_slots import compute_time_slots
+from benchmarks.mock_apify import serve_in_subprocess, fetch_stats
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+
+
+class StageTimer:
+    """
+    Records wall-clock seconds and peak traced memory for named pipeline stages
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = []
+
+    def run(self, name, func, *args, **kwargs):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+        self.stages.append({"stage": name, "seconds": round(elapsed, 4), "peak_bytes": peak})
+        return result
+
+
+def run_pipeline(size, trace_memory=True):
+    """
+    Scrape `size` synthetic posts from the mock server and run every analysis stage once
+    """
+    timer = StageTimer(trace_memory)
+    start = time.perf_counter()
+
+    posts = timer.run("start+wait run", apify_scraper.scrape_payload,
+                      apify_scraper.hashtag_payload("benchmark", size),
+                      "no posts", stream=True, verbose=False)
+    # Dataset pages are downloaded lazily while normalize_data consumes them
+    df = timer.run("download+normalize", normalize_data, posts)
+    hashtags = timer.run("hashtag table", build_hashtag_table, df["caption"])
+    timer.run("domain hashtags", analyze_domain_hashtags, df["caption"], "food", hashtags=hashtags)
+    timer.run("trending hashtags", find_trending_hashtags, df["caption"], 2, hashtags=hashtags)
+    slots = timer.run("time slots", compute_time_slots, df)
+    timer.run("engagement", estimate_avg_engagement, df, slots=slots)
+    timer.run("posting schedule", analyze_posting_schedule, df, slots=slots)
+
+    return {
+        "posts": size,
+        "rows": len(df),
+        "total_seconds": round(time.perf_counter() - start, 4),
+        "posts_per_second": round(len(df) / max(time.perf_counter() - start, 1e-9), 1),
+        "stages": timer.stages,
+    }
+
+
+def _format_bytes(value):
+    if value is None:
+        return "-"
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if value < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TiB"
+
+
+def print_report(results):
+    for result in results:
+        print(f"\n📊 {result['posts']:,} posts: {result['total_seconds']:.2f}s end-to-end "
+              f"({result['posts_per_second']:,.0f} posts/s)")
+        for stage in result["stages"]:
+            print(f"   {stage['stage']:<20} {stage['seconds']:>9.3f}s   peak {_format_bytes(stage['peak_bytes'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the scrape -> normalize -> analyze pipeline")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Corpus sizes to benchmark")
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock API latency per request (seconds)")
+    parser.add_argument("--run-duration", type=float, default=0.5, help="Mock actor run duration (seconds)")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Skip per-stage memory tracing (faster)")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON to PATH")
+    args = parser.parse_args(argv)
+
+    # Measure the network path every time: no local result cache, no run reuse, no run journal
+    apify_scraper.RESULT_CACHE_ENABLED = False
+    apify_scraper.REUSE_RECENT_RUNS = False
+    apify_scraper.RUN_JOURNAL_ENABLED = False
+
+    trace_memory = not args.no_tracemalloc
+    if trace_memory:
+        tracemalloc.start()
+
+    results = []
+    with serve_in_subprocess(latency=args.latency, run_duration=args.run_duration) as base_url:
+        apify_scraper.set_client(apify_scraper.ApifyClient(token="benchmark", base_url=base_url))
+        for size in args.sizes:
+            print(f"⏱️  Benchmarking {size:,} posts...")
+            results.append(run_pipeline(size, trace_memory))
+        request_counts = fetch_stats(base_url)
+
+    report = {
+        "latency": args.latency,
+        "run_duration": args.run_duration,
+        "results": results,
+        "requests": request_counts,
+        "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+    print_report(results)
+    print(f"\n🌐 Mock API requests: {request_counts}")
+    print(f"💾 Process max RSS: {_format_bytes(report['max_rss_bytes'])}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Results written to {args.json}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Synthetic Instagram post corpora shaped like the Apify instagram-scraper output
+"""
+
+import itertools
+import random
+import string
+from datetime import datetime, timedelta, timezone
+
+HEAD_HASHTAGS = [
+    "#food", "#foodie", "#instafood", "#yummy", "#delicious", "#foodporn", "#homemade",
+    "#fashion", "#style", "#ootd", "#outfit", "#fashionblogger", "#streetstyle",
+    "#travel", "#wanderlust", "#travelgram", "#vacation", "#adventure", "#explore",
+    "#fitness", "#gym", "#workout", "#fitfam", "#health", "#motivation",
+    "#beauty", "#makeup", "#skincare", "#photography", "#photooftheday", "#art",
+    "#instagood", "#love", "#reels", "#viral", "#trending", "#explorepage",
+]
+LONG_TAIL_SIZE = 5000       # Distinct rare hashtags after the popular head
+ZIPF_EXPONENT = 1.1         # Popularity skew of hashtag usage
+WORDS = [
+    "today", "amazing", "weekend", "sunset", "coffee", "new", "recipe", "look", "city",
+    "friends", "morning", "vibes", "best", "summer", "happy", "day", "love", "this",
+    "with", "my", "the", "and", "finally", "tried", "back", "again", "🔥", "✨", "😍",
+]
+TYPENAMES = ["GraphImage", "GraphVideo", "GraphSidecar"]
+TYPENAME_WEIGHTS = [0.6, 0.25, 0.15]
+TIME_SPAN_DAYS = 90
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+VOCABULARY = HEAD_HASHTAGS + [f"#tag{n}" for n in range(LONG_TAIL_SIZE)]
+_CUM_WEIGHTS = list(itertools.accumulate(1 / (rank ** ZIPF_EXPONENT) for rank in range(1, len(VOCABULARY) + 1)))
+
+
+def _shortcode(rng):
+    return "".join(rng.choices(string.ascii_letters + string.digits + "_-", k=11))
+
+
+def generate_post(index, seed=0, owner="syntheticuser"):
+    """
+    Build one deterministic synthetic post; the same (index, seed) always gives the same post
+    """
+    rng = random.Random(seed * 1_000_003 + index)
+
+    hashtags = rng.choices(VOCABULARY, cum_weights=_CUM_WEIGHTS, k=rng.randint(0, 25))
+    words = rng.choices(WORDS, k=rng.randint(3, 30))
+    caption = None if rng.random() < 0.05 else " ".join(words + hashtags)
+
+    taken_at = EPOCH + timedelta(seconds=rng.randint(0, TIME_SPAN_DAYS * 24 * 60 * 60))
+    likes = int(rng.lognormvariate(5, 1.5))
+    comments = int(likes * rng.uniform(0.005, 0.05))
+    shortcode = _shortcode(rng)
+    typename = rng.choices(TYPENAMES, weights=TYPENAME_WEIGHTS)[0]
+
+    return {
+        "id": str(3_000_000_000_000_000_000 + seed * 10_000_000 + index),
+        "type": typename.replace("Graph", ""),
+        "typename": typename,
+        "shortCode": shortcode,
+        "url": f"https://www.instagram.com/p/{shortcode}/",
+        "caption": caption,
+        "hashtags": [tag[1:] for tag in hashtags],
+        "likesCount": likes,
+        "commentsCount": comments,
+        "timestamp": taken_at.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "takenAtTimestamp": int(taken_at.timestamp()),
+        "ownerUsername": owner,
+        "owner": {"id": str(seed), "username": owner, "isVerified": False},
+        "dimensionsHeight": 1080,
+        "dimensionsWidth": 1080,
+        "images": [f"https://cdn.example.com/{shortcode}/{n}.jpg" for n in range(rng.randint(1, 4))],
+        "latestComments": [
+            {"id": f"{index}-{n}", "text": " ".join(rng.choices(WORDS, k=5)), "ownerUsername": f"fan{n}"}
+            for n in range(min(comments, 3))
+        ],
+        "childPosts": [],
+    }
+
+
+def generate_posts(count, seed=0, offset=0, owner="syntheticuser"):
+    """
+    Yield count synthetic posts starting at offset without holding them all in memory
+    """
+    for index in range(offset, offset + count):
+        yield generate_post(index, seed=seed, owner=owner)
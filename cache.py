@@ -0,0 +1,456 @@
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+
+from instrumentation import metrics
+
+CACHE_DIR = ".cache"
+
+TRENDING_CACHE_FILE = os.path.join(CACHE_DIR, "trending_hashtags.json")
+TRENDING_CACHE_TTL = 6 * 60 * 60         # Seconds a discovery result is considered fresh
+TRENDING_CACHE_MAX_STALE = 24 * 60 * 60  # Stale results older than this are rediscovered synchronously
+
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_DIR = os.path.join(CACHE_DIR, "results")
+RESULT_CACHE_MAX_AGE = 60 * 60                # Seconds a cached dataset is served for
+RESULT_CACHE_MAX_BYTES = 512 * 1024 * 1024    # Total compressed size kept before LRU eviction
+
+PROFILE_HISTORY_DIR = os.path.join(CACHE_DIR, "profiles")
+PROFILE_HISTORY_MAX_POSTS = 1000              # Newest posts kept per profile
+
+RUN_JOURNAL_ENABLED = True
+RUN_JOURNAL_FILE = os.path.join(CACHE_DIR, "runs.json")
+RUN_JOURNAL_MAX_AGE = 24 * 60 * 60            # Journaled runs older than this are never reattached
+
+
+def write_json_atomic(path, data):
+    """
+    Write JSON to a temp file and rename it over the target so readers never see partial files
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class TrendingHashtagCache:
+    """
+    On-disk cache of discovered trending hashtags, keyed by domain and sample size.
+
+    Fresh entries (younger than ttl) are served directly. Stale entries (younger
+    than max_stale) are served immediately while a background thread rediscovers
+    them (stale-while-revalidate). Anything older is rediscovered before returning.
+    """
+
+    def __init__(self, path=TRENDING_CACHE_FILE, ttl=TRENDING_CACHE_TTL, max_stale=TRENDING_CACHE_MAX_STALE):
+        self.path = path
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._lock = threading.Lock()
+        self._refreshing = set()
+
+    @staticmethod
+    def _key(domain, sample_size):
+        return f"{domain.lower()}:{sample_size}"
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, domain, sample_size):
+        """
+        Return (hashtags, age_in_seconds) for a cached entry, or (None, None)
+        """
+        with self._lock:
+            entry = self._load().get(self._key(domain, sample_size))
+        if not entry:
+            return None, None
+        return entry["hashtags"], time.time() - entry["discovered_at"]
+
+    def set(self, domain, sample_size, hashtags):
+        """
+        Store a discovery result (empty results are not cached)
+        """
+        if not hashtags:
+            return
+        with self._lock:
+            data = self._load()
+            data[self._key(domain, sample_size)] = {
+                "hashtags": list(hashtags),
+                "discovered_at": time.time(),
+            }
+            write_json_atomic(self.path, data)
+
+    def _refresh(self, domain, sample_size, discover):
+        key = self._key(domain, sample_size)
+        try:
+            self.set(domain, sample_size, discover(domain, sample_size))
+        except Exception as e:
+            print(f"⚠️  Background refresh of trending hashtags for {domain} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_or_discover(self, domain, sample_size, discover):
+        """
+        Return cached hashtags for the domain, calling discover(domain, sample_size)
+        only when the entry is missing or too old to serve
+        """
+        hashtags, age = self.get(domain, sample_size)
+
+        if hashtags is not None and age < self.ttl:
+            print(f"💾 Using cached trending hashtags for {domain} ({int(age // 60)} min old)")
+            return hashtags
+
+        if hashtags is not None and age < self.max_stale:
+            key = self._key(domain, sample_size)
+            with self._lock:
+                start_refresh = key not in self._refreshing
+                self._refreshing.add(key)
+            if start_refresh:
+                # Daemon thread: if the process exits first the entry stays stale and the next
+                # call refreshes it. discover must not start non-daemon threads either (see
+                # trending_hashtags.sample_seed_hashtags), or exit still waits for them.
+                threading.Thread(target=self._refresh, args=(domain, sample_size, discover),
+                                 name=f"trending-refresh-{key}", daemon=True).start()
+            print(f"💾 Using stale trending hashtags for {domain} ({int(age // 60)} min old), refreshing in background")
+            return hashtags
+
+        hashtags = discover(domain, sample_size)
+        self.set(domain, sample_size, hashtags)
+        return hashtags
+
+
+def payload_key(payload):
+    """
+    Content address of a scrape payload: SHA-256 of its canonical JSON form
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of actor datasets keyed by the scrape payload.
+
+    Each entry is a gzip-compressed JSONL file whose first line records when it
+    was cached; entries older than max_age are treated as misses. A file's mtime
+    is bumped on every hit, and the least recently used files are evicted once
+    the directory grows past max_bytes.
+    """
+
+    def __init__(self, directory=RESULT_CACHE_DIR, max_age=RESULT_CACHE_MAX_AGE, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.jsonl.gz")
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.inc("result_cache_lookups_total", result="hit" if hit else "miss")
+
+    @staticmethod
+    def _iter_entry(path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            next(f)  # Header line
+            for line in f:
+                yield json.loads(line)
+
+    def get(self, payload):
+        """
+        Return an iterator over the cached posts for the payload, or None on a miss
+        """
+        path = self._path(payload_key(payload))
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+        except (OSError, ValueError, EOFError):
+            self._count(hit=False)
+            return None
+
+        if time.time() - header.get("cached_at", 0) > self.max_age:
+            self._remove(path)
+            self._count(hit=False)
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        self._count(hit=True)
+        return self._iter_entry(path)
+
+    def open_writer(self, payload):
+        """
+        Start a new entry for the payload; see ResultCacheWriter
+        """
+        return ResultCacheWriter(self, payload)
+
+    def write_through(self, payload, items):
+        """
+        Yield items unchanged while writing them to the cache.
+        The entry is only committed once the iterator has been fully consumed.
+        """
+        writer = self.open_writer(payload)
+        committed = False
+        try:
+            for item in items:
+                writer.write((item,))
+                yield item
+            writer.commit()
+            committed = True
+        finally:
+            if not committed:
+                writer.abort()
+
+    def evict(self):
+        """
+        Delete least recently used entries until the cache fits in max_bytes
+        """
+        try:
+            entries = [
+                entry for entry in os.scandir(self.directory)
+                if entry.name.endswith(".jsonl.gz")
+            ]
+        except OSError:
+            return
+        entries = [(entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries]
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self):
+        """
+        Hit/miss counters plus the current number and size of entries
+        """
+        try:
+            sizes = [
+                entry.stat().st_size for entry in os.scandir(self.directory)
+                if entry.name.endswith(".jsonl.gz")
+            ]
+        except OSError:
+            sizes = []
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(sizes),
+                "bytes": sum(sizes),
+            }
+
+
+class ResultCacheWriter:
+    """
+    Writes one ResultCache entry to a temporary file as items arrive.
+    commit() makes the entry visible to readers; abort() throws it away.
+    """
+
+    _sequence = itertools.count()
+
+    def __init__(self, cache, payload):
+        os.makedirs(cache.directory, exist_ok=True)
+        self._cache = cache
+        self._path = cache._path(payload_key(payload))
+        self._tmp_path = f"{self._path}.{os.getpid()}.{next(self._sequence)}.tmp"
+        self._file = gzip.open(self._tmp_path, "wt", encoding="utf-8")
+        self._file.write(json.dumps({"cached_at": time.time()}) + "\n")
+
+    def write(self, items):
+        for item in items:
+            self._file.write(json.dumps(item) + "\n")
+
+    def commit(self):
+        self._file.close()
+        os.replace(self._tmp_path, self._path)
+        self._cache.evict()
+
+    def abort(self):
+        self._file.close()
+        self._cache._remove(self._tmp_path)
+
+class ProfileHistory:
+    """
+    Local snapshot of each scraped profile: its posts, newest first, plus a small
+    state record (newest post timestamp and shortcode, last update) that lets the
+    next scrape ask only for newer posts.
+
+    Each profile is one gzip-compressed JSONL file whose first line is the state.
+    """
+
+    def __init__(self, directory=PROFILE_HISTORY_DIR, max_posts=PROFILE_HISTORY_MAX_POSTS):
+        self.directory = directory
+        self.max_posts = max_posts
+        self._lock = threading.Lock()
+
+    def _path(self, username):
+        return os.path.join(self.directory, f"{username.lower()}.jsonl.gz")
+
+    def load(self, username):
+        """
+        Return (state, posts) for a profile, or (None, []) if it was never scraped
+        """
+        path = self._path(username)
+        try:
+            with self._lock, gzip.open(path, "rt", encoding="utf-8") as f:
+                state = json.loads(f.readline())
+                posts = [json.loads(line) for line in f]
+        except (OSError, ValueError, EOFError):
+            return None, []
+        return state, posts
+
+    def save(self, username, posts, newest_timestamp=None, newest_shortcode=None):
+        """
+        Replace the stored snapshot with posts (already merged and sorted newest first)
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        posts = posts[:self.max_posts]
+        state = {
+            "username": username.lower(),
+            "updated_at": time.time(),
+            "newest_timestamp": newest_timestamp,
+            "newest_shortcode": newest_shortcode,
+            "posts": len(posts),
+        }
+        path = self._path(username)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._lock:
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                f.write(json.dumps(state) + "\n")
+                for post in posts:
+                    f.write(json.dumps(post) + "\n")
+            os.replace(tmp_path, path)
+        return state
+
+
+class RunJournal:
+    """
+    On-disk record of the actor run started for each scrape payload.
+
+    A run is journaled as soon as it starts, so if the process dies or stops
+    waiting, the next scrape of the same payload can reattach to the run
+    instead of starting (and paying for) a new one. Entries are keyed by
+    payload_key and dropped once they are older than max_age.
+    """
+
+    def __init__(self, path=RUN_JOURNAL_FILE, max_age=RUN_JOURNAL_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, payload):
+        """
+        Return the journaled run ID for the payload, or None
+        """
+        with self._lock:
+            entry = self._load().get(payload_key(payload))
+        if not entry or time.time() - entry["started_at"] > self.max_age:
+            return None
+        return entry["run_id"]
+
+    def record(self, payload, run_id):
+        """
+        Journal a freshly started run, dropping entries that have expired
+        """
+        now = time.time()
+        with self._lock:
+            data = {key: entry for key, entry in self._load().items() if now - entry["started_at"] <= self.max_age}
+            data[payload_key(payload)] = {"run_id": run_id, "started_at": now}
+            write_json_atomic(self.path, data)
+
+    def remove(self, payload, run_id=None):
+        """
+        Forget the payload's run (only if it is still run_id, when given)
+        """
+        key = payload_key(payload)
+        with self._lock:
+            data = self._load()
+            entry = data.get(key)
+            if entry is None or (run_id is not None and entry["run_id"] != run_id):
+                return
+            del data[key]
+            write_json_atomic(self.path, data)
+
+
+_trending_cache = None
+_result_cache = None
+_profile_history = None
+_run_journal = None
+_cache_lock = threading.Lock()
+
+
+def get_trending_cache():
+    """
+    Return the process-wide TrendingHashtagCache
+    """
+    global _trending_cache
+    with _cache_lock:
+        if _trending_cache is None:
+            _trending_cache = TrendingHashtagCache()
+        return _trending_cache
+
+
+def get_result_cache():
+    """
+    Return the process-wide ResultCache
+    """
+    global _result_cache
+    with _cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache()
+        return _result_cache
+
+
+def get_profile_history():
+    """
+    Return the process-wide ProfileHistory
+    """
+    global _profile_history
+    with _cache_lock:
+        if _profile_history is None:
+            _profile_history = ProfileHistory()
+        return _profile_history
+
+
+def get_run_journal():
+    """
+    Return the process-wide RunJournal
+    """
+    global _run_journal
+    with _cache_lock:
+        if _run_journal is None:
+            _run_journal = RunJournal()
+        return _run_journal
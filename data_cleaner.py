@@ -1,16 +1,170 @@
+import itertools
+import numpy as np
 import pandas as pd
 from config import REQUIRED_COLUMNS
+from instrumentation import metrics
 
-def normalize_data(raw_data):
+NORMALIZE_FAST_PATH = True   # Pull REQUIRED_COLUMNS straight from the post dicts instead of json_normalize
+NORMALIZE_CHUNK_SIZE = 1000  # Raw posts flattened at a time by the json_normalize path
+
+NORMALIZE_COMPACT = False    # Return the compact memory layout from normalize_data
+COMPACT_CATEGORICAL_COLUMNS = ["typename"]    # Few distinct values, stored as categoricals
+COMPACT_STRING_COLUMNS = ["caption", "url"]   # Stored as pyarrow-backed strings when pyarrow is installed
+
+_MISSING = object()
+_NAN = float("nan")
+
+
+def _iter_chunks(raw_data, chunk_size):
+    """
+    Yield lists of at most chunk_size posts from any iterable
+    """
+    iterator = iter(raw_data)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _lookup(post, column):
+    """
+    Value of a json_normalize-style column in a post: a top-level key, or a
+    dotted path into nested objects. Objects themselves count as missing, since
+    json_normalize would have flattened them into sub-columns.
+    """
+    value = post.get(column, _MISSING)
+    if value is _MISSING and "." in column:
+        value = post
+        for part in column.split("."):
+            if not isinstance(value, dict):
+                return _MISSING
+            value = value.get(part, _MISSING)
+            if value is _MISSING:
+                return _MISSING
+    if isinstance(value, dict):
+        return _MISSING
+    return value
+
+
+def _frame_from_fields(raw_data, columns):
     """
-    Normalize and clean Instagram data from Apify scraper
+    Build a DataFrame of just the given columns directly from the post dicts.
+    Columns no post contains are left out, as json_normalize would.
     """
-    if not raw_data:
+    values = {col: [] for col in columns}
+    present = set()
+    for post in raw_data:
+        for col in columns:
+            value = _lookup(post, col)
+            if value is _MISSING:
+                value = _NAN
+            else:
+                present.add(col)
+            values[col].append(value)
+    
+    if not values[columns[0]]:
+        return None
+    return pd.DataFrame({col: values[col] for col in columns if col in present},
+                        index=pd.RangeIndex(len(values[columns[0]])))
+
+
+def _frame_from_json_normalize(raw_data, columns, chunk_size):
+    """
+    Flatten posts chunk by chunk with json_normalize, keeping only the given columns
+    """
+    frames = []
+    for chunk in _iter_chunks(raw_data, chunk_size):
+        chunk_df = pd.json_normalize(chunk)
+        frames.append(chunk_df[[col for col in columns if col in chunk_df.columns]])
+    
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def _arrow_string_dtype():
+    """
+    pyarrow-backed string dtype, or None when pyarrow is not installed
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    return pd.StringDtype("pyarrow")
+
+
+def compact_dataframe(df, categorical_columns=COMPACT_CATEGORICAL_COLUMNS, string_columns=COMPACT_STRING_COLUMNS):
+    """
+    Return a copy of df with a smaller memory layout.
+    
+    Integer columns are downcast to int32 when their values fit (never smaller,
+    so adding two count columns cannot overflow), low-cardinality columns become
+    categoricals and text columns pyarrow-backed strings. Values are unchanged.
+    """
+    df = df.copy()
+    int32 = np.iinfo(np.int32)
+    for col in df.select_dtypes(include="integer").columns:
+        if df[col].dtype.itemsize > 4 and (df[col].empty or (df[col].min() >= int32.min and df[col].max() <= int32.max)):
+            df[col] = df[col].astype(np.int32)
+    
+    for col in categorical_columns:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    
+    string_dtype = _arrow_string_dtype()
+    if string_dtype is not None:
+        for col in string_columns:
+            if col in df.columns and df[col].dtype == object:
+                df[col] = df[col].astype(string_dtype)
+    
+    return df
+
+
+def memory_report(df, baseline=None):
+    """
+    Deep memory usage per column (bytes and dtype) plus a total row.
+    With a baseline DataFrame, its usage and the saving ratio are included too.
+    """
+    report = pd.DataFrame({
+        "dtype": df.dtypes.astype(str),
+        "bytes": df.memory_usage(deep=True, index=False).astype("Int64"),
+    })
+    if baseline is not None:
+        baseline_usage = baseline.memory_usage(deep=True, index=False)
+        report["baseline_bytes"] = baseline_usage.reindex(report.index).astype("Int64")
+    
+    report.loc["total"] = report.sum(numeric_only=True)
+    report.loc["total", "dtype"] = ""
+    
+    if baseline is not None:
+        report["saving"] = (report["baseline_bytes"] / report["bytes"]).round(2)
+    
+    return report
+
+
+def normalize_data(raw_data, chunk_size=NORMALIZE_CHUNK_SIZE, fast=NORMALIZE_FAST_PATH, compact=NORMALIZE_COMPACT):
+    """
+    Normalize and clean Instagram data from Apify scraper.
+    
+    raw_data may be a list or any iterator of posts (e.g. a streamed dataset).
+    Only REQUIRED_COLUMNS are read from each post, so the full nested payload is
+    never flattened or held in memory at once. fast=False uses the original
+    chunked json_normalize path, which gives the same result. compact=True
+    returns the smaller layout of compact_dataframe.
+    """
+    if raw_data is None or (isinstance(raw_data, (list, tuple)) and not raw_data):
         raise ValueError("No data provided to normalize")
     
     try:
-        # Convert to DataFrame
-        df = pd.json_normalize(raw_data)
+        # Convert to DataFrame, keeping only the columns we need
+        if fast:
+            df = _frame_from_fields(raw_data, REQUIRED_COLUMNS)
+        else:
+            df = _frame_from_json_normalize(raw_data, REQUIRED_COLUMNS, chunk_size)
+        
+        if df is None:
+            raise ValueError("No data provided to normalize")
         
         # Check if required columns exist
         missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
@@ -44,6 +198,10 @@ def normalize_data(raw_data):
         # Clean captions
         df["caption"] = df["caption"].fillna("")
         
+        if compact:
+            df = compact_dataframe(df)
+        
+        metrics.inc("rows_processed_total", len(df), stage="normalize")
         print(f"✅ Data normalized successfully. Shape: {df.shape}")
         return df
         
@@ -1,13 +1,18 @@
 import pandas as pd
+from time_slots import compute_time_slots
 
-def estimate_avg_engagement(df: pd.DataFrame) -> pd.DataFrame:
-    df["day"] = df["takenAtTimestamp"].dt.day_name()
-    df["hour"] = df["takenAtTimestamp"].dt.hour
+def estimate_avg_engagement(df: pd.DataFrame, slots=None) -> pd.DataFrame:
+    """
+    Average likes/comments and post count per (day, hour) slot, best slots first.
+    df is not modified; pass precomputed time slots to skip the aggregation.
+    """
+    if slots is None:
+        slots = compute_time_slots(df)
 
-    grouped = df.groupby(["day", "hour"]).agg({
-        "likesCount": "mean",
-        "commentsCount": "mean",
-        "caption": "count"
-    }).rename(columns={"caption": "num_posts"}).round(2)
+    grouped = slots.to_frame().sort_index()[["likes_mean", "comments_mean", "count"]].rename(columns={
+        "likes_mean": "likesCount",
+        "comments_mean": "commentsCount",
+        "count": "num_posts",
+    }).round(2)
 
     return grouped.sort_values(by="likesCount", ascending=False)
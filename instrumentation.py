@@ -0,0 +1,181 @@
+import bisect
+import contextlib
+import contextvars
+import json
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus style
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for le, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            yield le, total
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Metrics:
+    """
+    Process-wide registry of counters, histograms and timed spans.
+
+    Recording is a dict update under a lock, so it stays on all the time;
+    main.py --profile decides whether anything is exported.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+            self.spans = []
+            self.started = time.time()
+
+    def inc(self, name, value=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(buckets)
+            series[key].observe(value)
+
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        """
+        Time a block of work as a named pipeline stage
+        """
+        start = time.perf_counter()
+        started_at = time.time()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.spans.append({
+                    "name": name,
+                    "start": round(started_at - self.started, 6),
+                    "seconds": round(seconds, 6),
+                    **attributes,
+                })
+            self.observe("pipeline_stage_seconds", seconds, stage=name)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "spans": list(self.spans),
+                "counters": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self.counters.items()
+                },
+                "histograms": {
+                    name: [
+                        {
+                            "labels": dict(key),
+                            "count": hist.count,
+                            "sum": round(hist.sum, 6),
+                            "buckets": {str(le): total for le, total in hist.cumulative()},
+                        }
+                        for key, hist in series.items()
+                    ]
+                    for name, series in self.histograms.items()
+                },
+            }
+
+    def to_prometheus(self):
+        """
+        Render all metrics in the Prometheus text exposition format
+        """
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in series.items():
+                    for le, total in hist.cumulative():
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', le)])} {total}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist.sum:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Write metrics to path: Prometheus text for *.prom files, JSON otherwise
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".prom"):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, indent=2)
+
+
+metrics = Metrics()
+
+
+_progress_listener = contextvars.ContextVar("progress_listener", default=None)
+
+
+@contextlib.contextmanager
+def progress_listener(callback):
+    """
+    Send report_progress events raised in this context to callback(stage, message, details).
+    Worker threads only see the listener if they run in a copy of the context.
+    """
+    token = _progress_listener.set(callback)
+    try:
+        yield
+    finally:
+        _progress_listener.reset(token)
+
+
+def report_progress(stage, message, **details):
+    """
+    Report a progress event to the current listener; a no-op when nobody is listening
+    """
+    callback = _progress_listener.get()
+    if callback is None:
+        return
+    try:
+        callback(stage, message, details)
+    except Exception as e:
+        # A broken listener must never break the scrape or analysis it observes
+        print(f"⚠️  Progress listener failed: {e}")
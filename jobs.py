@@ -0,0 +1,122 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import progress_listener
+
+JOB_WORKERS = 4           # Jobs run at once; further jobs wait in the queue
+JOB_RETENTION = 60 * 60   # Seconds a finished job stays available for polling
+JOB_MAX_EVENTS = 200      # Progress events kept per job (oldest are dropped)
+
+
+class Job:
+    """
+    One background task: its status, progress events and outcome.
+    Status moves from queued to running to succeeded or failed.
+    """
+
+    def __init__(self, description=""):
+        self.id = uuid.uuid4().hex
+        self.description = description
+        self.status = "queued"
+        self.events = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.status in ("succeeded", "failed")
+
+    def record(self, stage, message, details=None):
+        with self._lock:
+            self.events.append({"time": time.time(), "stage": stage, "message": message, **(details or {})})
+            del self.events[:-JOB_MAX_EVENTS]
+
+    def latest_event(self):
+        with self._lock:
+            return dict(self.events[-1]) if self.events else None
+
+    def stages(self):
+        """
+        Every stage reported so far, in order of first appearance
+        """
+        with self._lock:
+            return list(dict.fromkeys(event["stage"] for event in self.events))
+
+
+class JobRegistry:
+    """
+    Runs jobs on a bounded thread pool and keeps them by id so any session can poll them.
+
+    Progress reported with instrumentation.report_progress while a job runs is
+    recorded on that job. Finished jobs are dropped after `retention` seconds.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, retention=JOB_RETENTION):
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, description="", **kwargs):
+        """
+        Queue fn(*args, **kwargs) and return its Job immediately
+        """
+        job = Job(description)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        job.record("queued", "Waiting for a free worker")
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    @staticmethod
+    def _run(job, fn, args, kwargs):
+        job.status = "running"
+        job.started_at = time.time()
+        status = "failed"
+        try:
+            with progress_listener(job.record):
+                job.result = fn(*args, **kwargs)
+            job.record("done", "Finished")
+            status = "succeeded"
+        except Exception as e:
+            job.error = str(e)
+            job.record("failed", str(e))
+        finally:
+            # finished_at goes first: once status says done, _prune may read it
+            job.finished_at = time.time()
+            job.status = status
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_job_registry():
+    """
+    Return the process-wide JobRegistry
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = JobRegistry()
+        return _registry
@@ -1,12 +1,14 @@
-from apify_scraper import run_scraper, run_scraper_by_domain
-from data_cleaner import normalize_data
-from analyze_hashtags import extract_hashtags, analyze_domain_hashtags, find_trending_hashtags
-from analyze_schedule import analyze_posting_schedule
-from engagement_estimator import estimate_avg_engagement
+# Only lightweight modules are imported here so --help, option checks and the
+# domain list start instantly; pandas/requests and the analyzers are imported
+# in run_analysis, on the path that needs them.
 from config import DEFAULT_USERNAME, DOMAIN_HASHTAGS
+from instrumentation import metrics
 import sys
 import json
 
+DEFAULT_PROFILE_PATH = "profile.json"
+OPTIONS = ['--static', '--trending', '--store', '--full', '--compact', '--profile']
+
 def print_usage():
     """Print usage instructions"""
     print("\n📋 Instagram Analytics Scraper Usage:")
@@ -19,6 +21,13 @@ def print_usage():
     print("\n🔧 Options:")
     print("   python main.py <domain> --static    # Use static hashtags only")
     print("   python main.py <domain> --trending  # Force trending discovery")
+    print("   python main.py <target> --profile   # Write stage timings and API metrics to profile.json")
+    print("   python main.py <target> --profile=metrics.prom  # ...or as a Prometheus text file")
+    print("   python main.py <target> --store     # Append normalized posts to the Parquet post store")
+    print("   python main.py <username> --full    # Re-fetch every post instead of only new ones")
+    print("   python main.py <target> --compact   # Compact DataFrame layout, with a memory report")
+    print("\n📦 Batch mode (many profiles/domains in one process):")
+    print("   python batch.py targets.txt --workers 4 --output batch_results")
     print("\n💡 Examples:")
     print("   python main.py food          # Analyze food with trending hashtags")
     print("   python main.py fashion       # Analyze fashion with trending hashtags")
@@ -35,122 +44,191 @@ def main():
             print_usage()
             return
         
+        # Reject unknown options before anything heavy is loaded
+        unknown = [arg for arg in sys.argv[2:] if arg.split('=', 1)[0] not in OPTIONS]
+        if unknown:
+            print(f"❌ Unknown option(s): {', '.join(unknown)}")
+            print_usage()
+            sys.exit(2)
+        
         # Parse command line arguments
         input_arg = sys.argv[1] if len(sys.argv) > 1 else None
         use_static = '--static' in sys.argv
         force_trending = '--trending' in sys.argv
+        store = '--store' in sys.argv
+        full_scrape = '--full' in sys.argv
+        compact = '--compact' in sys.argv
+        profile_path = None
+        for arg in sys.argv[2:]:
+            if arg == '--profile':
+                profile_path = DEFAULT_PROFILE_PATH
+            elif arg.startswith('--profile='):
+                profile_path = arg.split('=', 1)[1]
         
-        if not input_arg:
-            print_usage()
-            print("🔄 Using default profile for demo...")
-            input_arg = DEFAULT_USERNAME
-        
-        # Override global trending setting if specified
-        if use_static:
-            print("📋 Using static hashtags as requested")
-            import config
-            config.USE_TRENDING_HASHTAGS = False
-        elif force_trending:
-            print("🚀 Using trending hashtag discovery as requested")
-            import config
-            config.USE_TRENDING_HASHTAGS = True
-        
-        # Check if input is a domain or username
-        if input_arg.lower() in DOMAIN_HASHTAGS:
-            # Domain-based scraping
-            domain = input_arg.lower()
-            print(f"🎯 Analyzing Instagram domain: {domain.upper()}")
-            print(f"🏷️  Target hashtags: {', '.join(DOMAIN_HASHTAGS[domain])}")
-            raw_data = run_scraper_by_domain(domain)
-        else:
-            # Username-based scraping (original functionality)
-            username = input_arg
-            print(f"📱 Analyzing Instagram profile: @{username}")
-            raw_data = run_scraper(username)
+        if profile_path:
+            metrics.reset()
         
-        if not raw_data:
-            print("❌ No data retrieved. Exiting.")
-            sys.exit(1)
-            
-        print(f"✅ Retrieved {len(raw_data)} posts")
+        try:
+            run_analysis(input_arg, use_static, force_trending, store, full_scrape, compact)
+        finally:
+            if profile_path:
+                metrics.write(profile_path)
+                print(f"⏱️  Profile written to {profile_path}")
         
-        # Debug: Print raw API response
-        # print("\n🔍 DEBUG: Raw API Response:")
-        # print(json.dumps(raw_data, indent=2))
-        # print("\n" + "="*50 + "\n")
+    except KeyboardInterrupt:
+        print("\n⏹️  Analysis interrupted by user")
+    except Exception as e:
+        print(f"\n❌ Error during analysis: {e}")
+        print("Please check your internet connection and try again.")
+
+
+def store_posts(df, source, source_type):
+    """
+    Append normalized posts to the Parquet post store (requires pyarrow)
+    """
+    from post_store import append_posts, POST_STORE_DIR
+    try:
+        with metrics.span("store", rows=len(df)):
+            stored = append_posts(df, source, source_type)
+    except ImportError as e:
+        print(f"⚠️  Post store not available: {e}")
+        return
+    print(f"💾 Stored {stored} posts in {POST_STORE_DIR}")
+
+
+def run_analysis(input_arg, use_static=False, force_trending=False, store=False, full_scrape=False,
+                 compact=False):
+    """
+    Scrape and analyze a domain or profile, printing the results
+    """
+    if not input_arg:
+        print_usage()
+        print("🔄 Using default profile for demo...")
+        input_arg = DEFAULT_USERNAME
+    
+    # Trending setting for this analysis only (None keeps the configured default)
+    use_trending = None
+    if use_static:
+        print("📋 Using static hashtags as requested")
+        use_trending = False
+    elif force_trending:
+        print("🚀 Using trending hashtag discovery as requested")
+        use_trending = True
+    
+    from apify_scraper import run_scraper, run_scraper_by_domain
+    from data_cleaner import normalize_data, memory_report
+    from analyze_hashtags import build_hashtag_table, extract_hashtags, analyze_domain_hashtags, find_trending_hashtags
+    from engagement_estimator import estimate_avg_engagement
+    
+    # Check if input is a domain or username
+    if input_arg.lower() in DOMAIN_HASHTAGS:
+        # Domain-based scraping
+        domain = input_arg.lower()
+        print(f"🎯 Analyzing Instagram domain: {domain.upper()}")
+        print(f"🏷️  Target hashtags: {', '.join(DOMAIN_HASHTAGS[domain])}")
+        with metrics.span("scrape", target=domain):
+            raw_data = run_scraper_by_domain(domain, stream=True, use_trending=use_trending)
+    else:
+        # Username-based scraping (original functionality)
+        username = input_arg
+        print(f"📱 Analyzing Instagram profile: @{username}")
+        with metrics.span("scrape", target=username):
+            raw_data = run_scraper(username, stream=True, incremental=not full_scrape)
+    
+    if not raw_data:
+        print("❌ No data retrieved. Exiting.")
+        sys.exit(1)
         
-        # Clean and normalize data
-        df = normalize_data(raw_data)
-        print(f"📊 Processed {len(df)} posts for analysis")
+    # Debug: Print raw API response
+    # print("\n🔍 DEBUG: Raw API Response:")
+    # print(json.dumps(raw_data, indent=2))
+    # print("\n" + "="*50 + "\n")
+    
+    # Clean and normalize data (posts are streamed from the dataset page by page)
+    with metrics.span("download+normalize"):
+        df = normalize_data(raw_data, compact=compact)
+    print(f"✅ Retrieved {len(df)} posts")
+    if compact:
+        print("\n💾 Memory usage by column (bytes):")
+        print(memory_report(df))
+    print(f"📊 Processed {len(df)} posts for analysis")
 
-        # Determine if this is domain-based analysis
-        is_domain_analysis = input_arg and input_arg.lower() in DOMAIN_HASHTAGS
+    # Determine if this is domain-based analysis
+    is_domain_analysis = input_arg and input_arg.lower() in DOMAIN_HASHTAGS
+    
+    if store:
+        store_posts(df, input_arg, "domain" if is_domain_analysis else "profile")
+    
+    # Scan captions for hashtags once; every analyzer below reuses this table
+    with metrics.span("hashtag_table", rows=len(df)):
+        hashtag_table = build_hashtag_table(df["caption"])
+    metrics.inc("rows_processed_total", len(hashtag_table), stage="hashtag_table")
+    
+    if is_domain_analysis:
+        # Enhanced domain-specific hashtag analysis
+        print(f"\n📈 Domain-Specific Hashtag Analysis for {input_arg.upper()}:")
+        print("=" * 50)
         
-        if is_domain_analysis:
-            # Enhanced domain-specific hashtag analysis
-            print(f"\n📈 Domain-Specific Hashtag Analysis for {input_arg.upper()}:")
-            print("=" * 50)
+        with metrics.span("domain_hashtags"):
+            hashtag_analysis = analyze_domain_hashtags(df["caption"], input_arg.lower(), hashtags=hashtag_table)
+        
+        if hashtag_analysis:
+            print(f"📊 Total hashtags found: {hashtag_analysis['total_hashtags']}")
+            print(f"🏷️  Unique hashtags: {hashtag_analysis['unique_hashtags']}")
+            print(f"🌟 Hashtag diversity: {hashtag_analysis['hashtag_diversity']}%")
             
-            hashtag_analysis = analyze_domain_hashtags(df["caption"], input_arg.lower())
+            print(f"\n🔝 Top 15 Hashtags in {input_arg.upper()} Domain:")
+            for hashtag, count in hashtag_analysis['top_hashtags'][:15]:
+                print(f"  {hashtag}: {count} posts")
             
-            if hashtag_analysis:
-                print(f"📊 Total hashtags found: {hashtag_analysis['total_hashtags']}")
-                print(f"🏷️  Unique hashtags: {hashtag_analysis['unique_hashtags']}")
-                print(f"🌟 Hashtag diversity: {hashtag_analysis['hashtag_diversity']}%")
-                
-                print(f"\n🔝 Top 15 Hashtags in {input_arg.upper()} Domain:")
-                for hashtag, count in hashtag_analysis['top_hashtags'][:15]:
-                    print(f"  {hashtag}: {count} posts")
-                
-                # Show domain categories
-                print(f"\n🎯 Hashtag Categories Found:")
-                for domain, tags in hashtag_analysis['domain_categories'].items():
-                    if tags:
-                        print(f"\n  {domain.upper()} ({len(tags)} tags):")
-                        for hashtag, count in tags[:5]:  # Top 5 per category
-                            print(f"    {hashtag}: {count}")
-                
-                # Show trending uncategorized hashtags
-                if hashtag_analysis['uncategorized']:
-                    print(f"\n🚀 Trending Uncategorized Hashtags:")
-                    for hashtag, count in hashtag_analysis['uncategorized'][:10]:
-                        print(f"  {hashtag}: {count}")
+            # Show domain categories
+            print(f"\n🎯 Hashtag Categories Found:")
+            for domain, tags in hashtag_analysis['domain_categories'].items():
+                if tags:
+                    print(f"\n  {domain.upper()} ({len(tags)} tags):")
+                    for hashtag, count in tags[:5]:  # Top 5 per category
+                        print(f"    {hashtag}: {count}")
             
-            # Find trending hashtags
-            print(f"\n⭐ Trending Hashtags (appearing 2+ times):")
-            trending = find_trending_hashtags(df["caption"], min_frequency=2)
-            for hashtag, count in trending[:10]:
-                print(f"  {hashtag}: {count} posts")
-                
-        else:
-            # Original hashtag analysis for profile-based scraping
-            print("\n📈 Top Hashtags:")
-            hashtags = extract_hashtags(df["caption"])
-            for hashtag, count in hashtags:
-                print(f"  {hashtag}: {count}")
+            # Show trending uncategorized hashtags
+            if hashtag_analysis['uncategorized']:
+                print(f"\n🚀 Trending Uncategorized Hashtags:")
+                for hashtag, count in hashtag_analysis['uncategorized'][:10]:
+                    print(f"  {hashtag}: {count}")
+        
+        # Find trending hashtags
+        print(f"\n⭐ Trending Hashtags (appearing 2+ times):")
+        with metrics.span("trending_hashtags"):
+            trending = find_trending_hashtags(df["caption"], min_frequency=2, hashtags=hashtag_table)
+        for hashtag, count in trending[:10]:
+            print(f"  {hashtag}: {count} posts")
+            
+    else:
+        # Original hashtag analysis for profile-based scraping
+        print("\n📈 Top Hashtags:")
+        with metrics.span("top_hashtags"):
+            hashtags = extract_hashtags(df["caption"], hashtags=hashtag_table)
+        for hashtag, count in hashtags:
+            print(f"  {hashtag}: {count}")
 
-        # Analyze engagement
-        print("\n📊 Estimated Average Engagement by Time Slot:")
+    # Analyze engagement
+    print("\n📊 Estimated Average Engagement by Time Slot:")
+    with metrics.span("engagement", rows=len(df)):
         engagement_df = estimate_avg_engagement(df)
-        print(engagement_df.head(10))  # Top 10 time slots
+    metrics.inc("rows_processed_total", len(df), stage="engagement")
+    print(engagement_df.head(10))  # Top 10 time slots
 
-        # Find the best time slot (highest average likesCount)
-        if not engagement_df.empty:
-            best_row = engagement_df.sort_values(by="likesCount", ascending=False).iloc[0]
-            best_day = best_row.name[0]
-            best_hour = best_row.name[1]
-            best_likes = best_row["likesCount"]
-            print(f"\n⭐ Best time to post: {best_day} at {best_hour}:00 (Avg Likes: {best_likes})")
-        else:
-            print("\n⚠️  Not enough data to determine the best time to post.")
+    # Find the best time slot (highest average likesCount)
+    if not engagement_df.empty:
+        best_row = engagement_df.sort_values(by="likesCount", ascending=False).iloc[0]
+        best_day = best_row.name[0]
+        best_hour = best_row.name[1]
+        best_likes = best_row["likesCount"]
+        print(f"\n⭐ Best time to post: {best_day} at {best_hour}:00 (Avg Likes: {best_likes})")
+    else:
+        print("\n⚠️  Not enough data to determine the best time to post.")
+
+    print("\n✅ Analysis complete!")
 
-        print("\n✅ Analysis complete!")
-        
-    except KeyboardInterrupt:
-        print("\n⏹️  Analysis interrupted by user")
-    except Exception as e:
-        print(f"\n❌ Error during analysis: {e}")
-        print("Please check your internet connection and try again.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,139 @@
+import functools
+import operator
+import os
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+from config import REQUIRED_COLUMNS
+from instrumentation import metrics
+
+POST_STORE_DIR = os.path.join("data", "posts")
+POST_STORE_COMPRESSION = "zstd"
+PARTITION_COLUMNS = ["source", "date"]  # Hive-style: source=<domain|username>/date=<YYYY-MM-DD>/
+
+
+def _import_pyarrow():
+    """
+    Import pyarrow lazily so the rest of the tool works without it
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        from pyarrow import fs
+    except ImportError:
+        raise ImportError("pyarrow is required for the post store. Install it with: pip install pyarrow") from None
+    return pa, ds, fs
+
+
+def _schema(pa):
+    column_types = {
+        "url": pa.string(),
+        "likesCount": pa.int64(),
+        "commentsCount": pa.int64(),
+        "caption": pa.string(),
+        "takenAtTimestamp": pa.timestamp("ns"),
+        "typename": pa.string(),
+    }
+    fields = [(col, column_types.get(col, pa.string())) for col in REQUIRED_COLUMNS]
+    fields += [
+        ("source_type", pa.string()),
+        ("fetched_at", pa.timestamp("us", tz="UTC")),
+        ("source", pa.string()),
+        ("date", pa.string()),
+    ]
+    return pa.schema(fields)
+
+
+def _partitioning(pa, ds):
+    return ds.partitioning(pa.schema([(col, pa.string()) for col in PARTITION_COLUMNS]), flavor="hive")
+
+
+def append_posts(df, source, source_type="profile", fetched_at=None, directory=POST_STORE_DIR):
+    """
+    Append normalized posts to the partitioned Parquet dataset.
+
+    Rows are partitioned by source (domain or username) and by the date the post
+    was taken. Every call writes new files, so concurrent appends never collide.
+    Returns the number of rows written.
+    """
+    pa, ds, _ = _import_pyarrow()
+
+    if df is None or df.empty:
+        return 0
+
+    fetched_at = fetched_at or datetime.now(timezone.utc)
+    frame = df[REQUIRED_COLUMNS].copy()
+    frame["source_type"] = source_type
+    frame["fetched_at"] = pd.Timestamp(fetched_at)
+    frame["source"] = source.lower()
+    frame["date"] = frame["takenAtTimestamp"].dt.strftime("%Y-%m-%d")
+
+    table = pa.Table.from_pandas(frame, schema=_schema(pa), preserve_index=False)
+    ds.write_dataset(
+        table,
+        directory,
+        format="parquet",
+        partitioning=_partitioning(pa, ds),
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        file_options=ds.ParquetFileFormat().make_write_options(compression=POST_STORE_COMPRESSION),
+    )
+
+    metrics.inc("rows_processed_total", len(frame), stage="store")
+    return len(frame)
+
+
+def _date_string(value):
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def load_posts(sources=None, columns=None, start_date=None, end_date=None, latest_only=True,
+               directory=POST_STORE_DIR):
+    """
+    Load stored posts as a DataFrame, reading only the requested columns and partitions.
+
+    sources is a name or list of names; start_date/end_date bound the post date
+    (inclusive). Files are memory-mapped rather than copied into Python buffers.
+    With latest_only, a post stored by several scrapes is returned once, from the
+    most recent fetch.
+    """
+    pa, ds, fs = _import_pyarrow()
+
+    if not os.path.isdir(directory):
+        return pd.DataFrame(columns=columns or _schema(pa).names)
+
+    dataset = ds.dataset(
+        directory,
+        schema=_schema(pa),
+        format="parquet",
+        partitioning=_partitioning(pa, ds),
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+
+    filters = []
+    if sources is not None:
+        sources = [sources] if isinstance(sources, str) else list(sources)
+        filters.append(ds.field("source").isin([source.lower() for source in sources]))
+    if start_date is not None:
+        filters.append(ds.field("date") >= _date_string(start_date))
+    if end_date is not None:
+        filters.append(ds.field("date") <= _date_string(end_date))
+    condition = functools.reduce(operator.and_, filters) if filters else None
+
+    read_columns = list(columns) if columns else list(dataset.schema.names)
+    dedupe_columns = ["source", "url", "fetched_at"]
+    if latest_only:
+        read_columns += [col for col in dedupe_columns if col not in read_columns]
+
+    df = dataset.to_table(columns=read_columns, filter=condition).to_pandas()
+
+    if latest_only and not df.empty:
+        df = (df.sort_values("fetched_at", kind="stable")
+                .drop_duplicates(subset=["source", "url"], keep="last"))
+    if "takenAtTimestamp" in df.columns:
+        df = df.sort_values("takenAtTimestamp", ascending=False, kind="stable")
+
+    df = df[list(columns) if columns else read_columns].reset_index(drop=True)
+    metrics.inc("rows_processed_total", len(df), stage="load")
+    return df
@@ -3,6 +3,7 @@
 Test script to verify all modules work correctly
 """
 
+import contextlib
 import sys
 import traceback
 
@@ -17,6 +18,42 @@ def test_module(module_name, test_func):
         traceback.print_exc()
         return False
 
+@contextlib.contextmanager
+def scraper_settings(base_url=None, client=None, result_cache=False, reuse_runs=False, run_journal=False,
+                     **cache_singletons):
+    """
+    Point the scrapers at a test API and switch their caches on or off for the
+    duration of a test. base_url creates an ApifyClient for it (or pass client);
+    cache_singletons replace cache module singletons, e.g. _run_journal=RunJournal(...).
+    Everything is restored afterwards and the client is closed, even if the test fails.
+    """
+    import apify_scraper
+    import async_scraper
+    import cache
+    
+    modules = (apify_scraper, async_scraper)
+    saved_flags = [(module.RESULT_CACHE_ENABLED, module.REUSE_RECENT_RUNS, module.RUN_JOURNAL_ENABLED)
+                   for module in modules]
+    saved_singletons = {name: getattr(cache, name) for name in cache_singletons}
+    if base_url is not None:
+        client = apify_scraper.ApifyClient(token="test", base_url=base_url)
+    try:
+        for module in modules:
+            module.RESULT_CACHE_ENABLED, module.REUSE_RECENT_RUNS, module.RUN_JOURNAL_ENABLED = (
+                result_cache, reuse_runs, run_journal)
+        for name, value in cache_singletons.items():
+            setattr(cache, name, value)
+        if client is not None:
+            apify_scraper.set_client(client)
+        yield client
+    finally:
+        if client is not None:
+            apify_scraper.set_client(None)  # Closes the test client; the next get_client() starts afresh
+        for name, value in saved_singletons.items():
+            setattr(cache, name, value)
+        for module, flags in zip(modules, saved_flags):
+            module.RESULT_CACHE_ENABLED, module.REUSE_RECENT_RUNS, module.RUN_JOURNAL_ENABLED = flags
+
 def test_apify_scraper():
     """Test the Apify scraper module"""
     from apify_scraper import run_scraper, run_scraper_by_domain, run_scraper_by_hashtag
@@ -58,10 +95,28 @@ def test_data_cleaner():
     df = normalize_data(mock_data)
     assert len(df) == 1, "Should process one row"
     assert "likesCount" in df.columns, "Should have likesCount column"
+    
+    # Streamed input (any iterator of posts) should give the same result
+    streamed_df = normalize_data(iter(mock_data * 3), chunk_size=2)
+    assert len(streamed_df) == 3, "Should process every streamed row"
+    assert streamed_df["likesCount"].tolist() == [100, 100, 100], "Should keep values across chunks"
+    
+    # The field-extraction fast path should match the json_normalize path
+    legacy_df = normalize_data(iter(mock_data * 3), chunk_size=2, fast=False)
+    assert streamed_df.equals(legacy_df), "Fast path should give the same DataFrame"
+    
+    # The compact layout should shrink the frame without changing any values
+    from data_cleaner import compact_dataframe, memory_report
+    compact_df = compact_dataframe(streamed_df)
+    assert str(compact_df["likesCount"].dtype) == "int32", "Should downcast counts"
+    assert str(compact_df["typename"].dtype) == "category", "Should store typename as a categorical"
+    assert compact_df.astype(object).equals(streamed_df.astype(object)), "Should keep every value"
+    report = memory_report(compact_df, baseline=streamed_df)
+    assert report.loc["total", "bytes"] < report.loc["total", "baseline_bytes"], "Should use less memory"
 
 def test_hashtag_analyzer():
     """Test the hashtag analyzer module"""
-    from analyze_hashtags import extract_hashtags, analyze_domain_hashtags, find_trending_hashtags
+    from analyze_hashtags import build_hashtag_table, extract_hashtags, analyze_domain_hashtags, find_trending_hashtags
     import pandas as pd
     
     # Test basic hashtag extraction
@@ -77,6 +132,11 @@ def test_hashtag_analyzer():
     # Test trending hashtags
     trending = find_trending_hashtags(captions, min_frequency=1)
     assert isinstance(trending, list), "Should return trending hashtags list"
+    
+    # Test the shared single-pass hashtag table
+    hashtag_table = build_hashtag_table(captions)
+    assert len(hashtag_table) == 7, "Should extract every hashtag occurrence"
+    assert extract_hashtags(captions, hashtags=hashtag_table) == hashtags, "Precomputed table should give the same result"
 
 def test_schedule_analyzer():
     """Test the schedule analyzer module"""
@@ -115,6 +175,15 @@ def test_engagement_estimator():
     df = normalize_data(mock_data)
     engagement_df = estimate_avg_engagement(df)
     assert not engagement_df.empty, "Should return engagement data"
+    assert "day" not in df.columns and "hour" not in df.columns, "Should not modify the input DataFrame"
+    
+    # Time slots: a dense 7x24 grid shared by engagement, schedule and the heatmap
+    from time_slots import compute_time_slots
+    slots = compute_time_slots(df)
+    assert slots.count.shape == (7, 24), "Should be a dense day x hour grid"
+    assert slots.count[5, 0] == 1, "2022-01-01 00:00 UTC is a Saturday"
+    assert slots.likes_median[5, 0] == 100 and slots.engagement_rate[5, 0] == 1.0
+    assert engagement_df.equals(estimate_avg_engagement(df, slots=slots)), "Precomputed slots should give the same result"
 
 def test_domain_configuration():
     """Test domain configuration and mappings"""
@@ -160,6 +229,487 @@ def test_trending_hashtags():
     except ImportError:
         print("⚠️  Trending hashtag module not available - skipping trending tests")
 
+def test_caches():
+    """Test the on-disk trending hashtag and result caches"""
+    import os
+    import subprocess
+    import tempfile
+    import threading
+    import time
+    from cache import TrendingHashtagCache, ResultCache
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Trending cache: a fresh entry should skip discovery
+        trending_cache = TrendingHashtagCache(path=os.path.join(tmp_dir, "trending.json"))
+        calls = []
+        discover = lambda domain, sample_size: calls.append(domain) or ["#foodporn", "#homecooking"]
+        assert trending_cache.get_or_discover("food", 3, discover) == ["#foodporn", "#homecooking"]
+        assert trending_cache.get_or_discover("food", 3, discover) == ["#foodporn", "#homecooking"]
+        assert len(calls) == 1, "Second lookup should be served from cache"
+        
+        # A stale entry is served at once while a daemon thread rediscovers it
+        trending_cache.ttl = 0
+        release = threading.Event()
+        def slow_discover(domain, sample_size):
+            calls.append(domain)
+            release.wait(5)
+            return ["#mealprep"]
+        assert trending_cache.get_or_discover("food", 3, slow_discover) == ["#foodporn", "#homecooking"]
+        assert trending_cache.get_or_discover("food", 3, slow_discover) == ["#foodporn", "#homecooking"]
+        refreshers = [thread for thread in threading.enumerate() if thread.name.startswith("trending-refresh-")]
+        assert len(refreshers) == 1, "Should refresh only once"
+        release.set()
+        refreshers[0].join(5)
+        assert len(calls) == 2 and trending_cache.get("food", 3)[0] == ["#mealprep"], "Refresh should update the entry"
+        
+        # A CLI run that starts a slow background refresh still exits as soon as it is done
+        script = "\n".join([
+            "import sys, time",
+            "import cache, trending_hashtags",
+            "trending_hashtags.scrape_hashtags_from_tag = lambda *args: time.sleep(5) or {'#slow': 2}",
+            "trending_cache = cache.TrendingHashtagCache(path=sys.argv[1], ttl=0)",
+            "trending_cache.set('food', 2, ['#foodporn'])",
+            "print(trending_cache.get_or_discover('food', 2, lambda d, n: "
+            "trending_hashtags.discover_trending_hashtags_for_domain(d, sample_size=n)))",
+        ])
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+        started = time.perf_counter()
+        child = subprocess.run([sys.executable, "-c", script, os.path.join(tmp_dir, "stale.json")],
+                               capture_output=True, text=True, env=env, cwd=tmp_dir, timeout=30)
+        elapsed = time.perf_counter() - started
+        assert child.returncode == 0 and "#foodporn" in child.stdout, child.stderr
+        assert elapsed < 3, f"Exit should not wait for the background refresh ({elapsed:.1f}s)"
+        
+        # Result cache: entries are keyed by payload and only committed once fully read
+        result_cache = ResultCache(directory=os.path.join(tmp_dir, "results"))
+        payload = {"directUrls": ["https://www.instagram.com/test/"], "resultsLimit": 2}
+        posts = [{"url": "https://test.com/p/1/"}, {"url": "https://test.com/p/2/"}]
+        assert result_cache.get(payload) is None, "Should miss before anything is cached"
+        assert list(result_cache.write_through(payload, iter(posts))) == posts
+        assert list(result_cache.get(dict(reversed(payload.items())))) == posts, "Key order should not matter"
+        assert result_cache.stats()["hits"] == 1 and result_cache.stats()["misses"] == 1
+
+def test_incremental_profiles():
+    """Test merging newly fetched profile posts into the stored snapshot"""
+    import tempfile
+    from apify_scraper import take_new_posts, merge_posts, post_timestamp
+    from cache import ProfileHistory
+    
+    stored = [
+        {"shortCode": "b", "takenAtTimestamp": 200, "likesCount": 5},
+        {"shortCode": "a", "takenAtTimestamp": 100, "likesCount": 1},
+    ]
+    fetched = [
+        {"shortCode": "a", "takenAtTimestamp": 100, "likesCount": 9},  # Pinned, already stored
+        {"shortCode": "c", "timestamp": "1970-01-01T00:05:00.000Z"},
+        {"shortCode": "b", "takenAtTimestamp": 200, "likesCount": 7},
+        {"shortCode": "a", "takenAtTimestamp": 100},
+    ]
+    
+    # The stream ends once stop_after consecutive posts are already known
+    new_posts = list(take_new_posts(iter(fetched), {"a", "b"}, stop_after=2))
+    assert [post["shortCode"] for post in new_posts] == ["a", "c", "b"]
+    
+    merged = merge_posts(new_posts, stored)
+    assert [post["shortCode"] for post in merged] == ["c", "b", "a"], "Should be newest first"
+    assert merged[1]["likesCount"] == 7, "Fresh copies should replace stored posts"
+    assert post_timestamp(merged[0]) == 300
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        history = ProfileHistory(directory=tmp_dir, max_posts=2)
+        assert history.load("someone") == (None, [])
+        history.save("Someone", merged, post_timestamp(merged[0]), "c")
+        state, posts = history.load("someone")
+        assert state["newest_timestamp"] == 300 and len(posts) == 2, "Should cap stored posts"
+        
+        # A failed run must not be served as "no new posts" from the snapshot
+        import apify_scraper
+        class ErrorItemClient:
+            # How the actor reports a blocked or restricted profile
+            def iter_dataset_items(self, dataset_id):
+                return iter([{"error": "not_found", "errorDescription": "Profile is restricted"}])
+            
+            def close(self):
+                pass
+        
+        run_actor = apify_scraper.run_actor
+        try:
+            with scraper_settings(client=ErrorItemClient(), _profile_history=history):
+                apify_scraper.run_actor = lambda payload, timeout=None, verbose=True: None
+                assert apify_scraper.run_scraper("someone", incremental=True) is None, "Should report the failed scrape"
+                # A run whose dataset is a single error item is a failure too
+                apify_scraper.run_actor = lambda payload, timeout=None, verbose=True: {"id": "r1", "defaultDatasetId": "ds-r1"}
+                assert apify_scraper.run_scraper("someone", incremental=True) is None, "Should report the actor error"
+        finally:
+            apify_scraper.run_actor = run_actor
+        assert history.load("someone")[0]["updated_at"] == state["updated_at"], "Should leave the snapshot alone"
+
+def test_jobs():
+    """Test background jobs and the progress events they record"""
+    import time
+    from jobs import JobRegistry
+    from instrumentation import report_progress
+    
+    def work(value):
+        report_progress("run_started", "Run started", run_id="abc")
+        return value * 2
+    
+    registry = JobRegistry(max_workers=2)
+    job = registry.submit(work, 21, description="double")
+    failing = registry.submit(lambda: 1 / 0)
+    deadline = time.time() + 5
+    while not (job.done and failing.done) and time.time() < deadline:
+        time.sleep(0.01)
+    
+    assert job.status == "succeeded" and job.result == 42
+    assert job.stages() == ["queued", "run_started", "done"], "Should record progress from inside the job"
+    assert failing.status == "failed" and "division" in failing.error
+    assert registry.get(job.id) is job
+    assert job.finished_at is not None and failing.finished_at is not None, "A done job should have finished_at set"
+    registry.retention = 0
+    registry.submit(lambda: None)
+    assert registry.get(job.id) is None, "Finished jobs past retention should be pruned"
+    report_progress("run_started", "Outside any job")  # Should be a no-op
+
+def test_post_store():
+    """Test appending to and loading from the Parquet post store"""
+    try:
+        import tempfile
+        import pandas as pd
+        from post_store import append_posts, load_posts
+        
+        df = pd.DataFrame({
+            "url": ["https://test.com/p/1/", "https://test.com/p/2/"],
+            "likesCount": [100, 200],
+            "commentsCount": [10, 20],
+            "caption": ["Post #food", "Post #yummy"],
+            "takenAtTimestamp": pd.to_datetime([1640995200, 1641081600], unit="s"),
+            "typename": ["GraphImage", "GraphVideo"],
+        })
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            assert append_posts(df, "food", "domain", directory=tmp_dir) == 2
+            assert append_posts(df.head(1), "food", "domain", directory=tmp_dir) == 1
+            append_posts(df, "natgeo", directory=tmp_dir)
+            
+            stored = load_posts("food", directory=tmp_dir)
+            assert len(stored) == 2, "Re-stored posts should be returned once"
+            assert set(stored["url"]) == set(df["url"])
+            
+            likes = load_posts(columns=["likesCount"], start_date="2022-01-02", directory=tmp_dir)
+            assert list(likes.columns) == ["likesCount"], "Should only load requested columns"
+            assert sorted(likes["likesCount"]) == [200, 200], "Should only load requested dates"
+        
+        print("✅ Post store round-trips normalized posts")
+        
+    except ImportError:
+        print("⚠️  pyarrow not installed - skipping post store tests")
+
+def test_profile_batches():
+    """Test scraping several profiles per actor run and splitting the posts by owner"""
+    import apify_scraper
+    from benchmarks.mock_apify import MockApifyServer
+    
+    payload = apify_scraper.profiles_payload(["alice", "bob"], 3)
+    assert payload["directUrls"] == ["https://www.instagram.com/alice/", "https://www.instagram.com/bob/"]
+    assert apify_scraper.profile_payload("alice", 3)["directUrls"] == payload["directUrls"][:1]
+    assert apify_scraper.post_owner({"inputUrl": "https://www.instagram.com/Alice/", "ownerUsername": "x"}) == "alice"
+    assert apify_scraper.post_owner({"ownerUsername": "Bob"}) == "bob"
+    
+    with MockApifyServer(latency=0, run_duration=0) as server, scraper_settings(base_url=server.base_url):
+        results = apify_scraper.run_scraper_batch(["alice", "@bob", "carol"], batch_size=2, max_posts=3)
+        assert server.request_counts["start_run"] == 2, "Should start one run per batch"
+    
+    assert list(results) == ["alice", "bob", "carol"]
+    for username, posts in results.items():
+        assert len(posts) == 3, f"Should return {username}'s posts"
+        assert all(post["ownerUsername"] == username for post in posts), "Should split posts by owner"
+    
+    # A batch whose run breaks fails each of its profiles instead of raising
+    def flaky_batch(usernames, max_posts=None):
+        if "bob" in usernames:
+            raise KeyError("defaultDatasetId")
+        return {username: [{"ownerUsername": username}] for username in usernames}
+    real_scrape_profile_batch, apify_scraper.scrape_profile_batch = apify_scraper.scrape_profile_batch, flaky_batch
+    try:
+        results = apify_scraper.run_scraper_batch(["alice", "bob", "carol", "dave"], batch_size=2)
+    finally:
+        apify_scraper.scrape_profile_batch = real_scrape_profile_batch
+    assert results == {"alice": None, "bob": None, "carol": [{"ownerUsername": "carol"}],
+                       "dave": [{"ownerUsername": "dave"}]}, "Other batches should still be returned"
+    
+    import batch
+    def broken_run(usernames):
+        raise KeyError("defaultDatasetId")
+    scrape_profile_batch, batch.scrape_profile_batch = batch.scrape_profile_batch, broken_run
+    try:
+        outcomes = batch.analyze_profile_batch(["alice", "bob"])
+    finally:
+        batch.scrape_profile_batch = scrape_profile_batch
+    assert [(target, result) for target, result, _ in outcomes] == [("alice", None), ("bob", None)]
+    assert all(isinstance(error, KeyError) for _, _, error in outcomes)
+
+def test_hashtag_fanout():
+    """Test splitting the post budget across hashtags and merging their posts"""
+    import apify_scraper
+    
+    assert apify_scraper.split_post_budget(50, 3) == [17, 17, 16], "Budget should add up to max_posts"
+    assert apify_scraper.split_post_budget(10, 5) == [2, 2, 2, 2, 2]
+    
+    requested = {}
+    def overlapping(hashtags, max_posts=None, stream=False):
+        requested[hashtags[0]] = max_posts
+        return [{"shortCode": f"p{i}", "hashtag": hashtags[0]} for i in range(max_posts)]
+    
+    def overshooting(hashtags, max_posts=None, stream=False):
+        # An actor run that returns more posts than it was asked for
+        return [{"shortCode": f"{hashtags[0]}-{i}"} for i in range(max_posts + 5)]
+    
+    real_run_scraper_by_hashtag = apify_scraper.run_scraper_by_hashtag
+    try:
+        apify_scraper.run_scraper_by_hashtag = overlapping
+        merged = apify_scraper.run_scraper_by_hashtags(["#food", "#yummy", "#food", "#chef"], max_posts=50)
+        assert requested == {"#food": 17, "#yummy": 17, "#chef": 16}, "Should split the budget over unique hashtags"
+        assert len(merged) == 17 and len({post["shortCode"] for post in merged}) == 17, "Should de-duplicate posts"
+        
+        requested.clear()
+        apify_scraper.run_scraper_by_hashtags(["#a", "#b", "#c", "#d"], max_posts=2)
+        assert sorted(requested.values()) == [1, 1], "Should not scrape more hashtags than posts"
+        
+        apify_scraper.run_scraper_by_hashtag = overshooting
+        merged = apify_scraper.run_scraper_by_hashtags(["#food", "#yummy", "#chef"], max_posts=50)
+        assert len(merged) == 50, "Merged posts should be capped at max_posts"
+    finally:
+        apify_scraper.run_scraper_by_hashtag = real_run_scraper_by_hashtag
+
+def test_batch_mode():
+    """Test per-target output, failure isolation and checkpoint resume in batch mode"""
+    import json
+    import os
+    import tempfile
+    import batch
+    from cache import ProfileHistory
+    from benchmarks.mock_apify import MockApifyServer
+    
+    def run_scraper(target, stream=False):
+        if target == "broken":
+            raise RuntimeError("profile is private")
+        return real_run_scraper(target, stream=stream)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_dir = os.path.join(tmp_dir, "results")
+        real_run_scraper, real_run_scraper_by_domain = batch.run_scraper, batch.run_scraper_by_domain
+        history = ProfileHistory(directory=os.path.join(tmp_dir, "profiles"))
+        batch.run_scraper = run_scraper
+        try:
+            with MockApifyServer(latency=0, run_duration=0) as server, \
+                    scraper_settings(base_url=server.base_url, _profile_history=history):
+                completed, failed = batch.run_batch(["alice", "broken", "bob"], output_dir=output_dir, workers=2)
+                assert (completed, failed) == (2, 1), "A failing target should not stop the others"
+                assert server.request_counts["start_run"] == 2
+                
+                for target in ("alice", "bob"):
+                    with open(batch.output_path(output_dir, target), "r", encoding="utf-8") as f:
+                        result = json.load(f)
+                    assert result["target"] == target and result["type"] == "profile" and result["posts"] > 0
+                assert not os.path.exists(batch.output_path(output_dir, "broken"))
+                with open(os.path.join(output_dir, batch.CHECKPOINT_FILE), "r", encoding="utf-8") as f:
+                    checkpoint = json.load(f)
+                assert checkpoint["completed"] == ["alice", "bob"] and "broken" in checkpoint["failed"]
+                
+                # A second run only retries what is not checkpointed as completed
+                completed, failed = batch.run_batch(["alice", "broken", "bob"], output_dir=output_dir, workers=2)
+                assert (completed, failed) == (0, 1)
+                assert server.request_counts["start_run"] == 2, "Should skip checkpointed targets"
+                
+                # The trending toggle is passed down per call instead of through a global
+                requested = []
+                def run_scraper_by_domain(domain, stream=False, use_trending=None):
+                    requested.append(use_trending)
+                    return None
+                batch.run_scraper_by_domain = run_scraper_by_domain
+                batch.run_batch(["food"], output_dir=output_dir, use_trending=False)
+                assert requested == [False], "Should pass use_trending to the domain scrape"
+        finally:
+            batch.run_scraper, batch.run_scraper_by_domain = real_run_scraper, real_run_scraper_by_domain
+
+def test_run_journal():
+    """Test reattaching to a run that an earlier scrape stopped waiting for"""
+    import os
+    import tempfile
+    import apify_scraper
+    import cache
+    from benchmarks.mock_apify import MockApifyServer
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        journal = cache.RunJournal(path=os.path.join(tmp_dir, "runs.json"))
+        payload = apify_scraper.hashtag_payload("#food", 5)
+        assert journal.get(payload) is None
+        journal.record(payload, "run-1")
+        assert journal.get(dict(reversed(payload.items()))) == "run-1", "Key order should not matter"
+        journal.remove(payload, "run-2")
+        assert journal.get(payload) == "run-1", "Should only remove the given run"
+        journal.remove(payload)
+        assert journal.get(payload) is None
+        
+        with MockApifyServer(latency=0, run_duration=1.5) as server, \
+                scraper_settings(base_url=server.base_url, run_journal=True, _run_journal=journal):
+            # Give up before the run finishes: it stays journaled...
+            assert apify_scraper.scrape_payload(payload, "empty", timeout=0.2, verbose=False) is None
+            assert journal.get(payload) is not None
+            # ...so the next scrape waits for that run instead of starting another one
+            posts = apify_scraper.scrape_payload(payload, "empty", verbose=False)
+            assert posts and len(posts) == 5
+            assert server.request_counts["start_run"] == 1, "Should reattach instead of starting a new run"
+            # Once its dataset has been read the run is forgotten, so a later scrape starts afresh
+            assert journal.get(payload) is None
+            assert apify_scraper.scrape_payload(payload, "empty", verbose=False)
+            assert server.request_counts["start_run"] == 2, "Should not reattach to a run that was already read"
+
+def test_run_reuse():
+    """Test reusing a recent run that was started with the same input"""
+    import time
+    import apify_scraper
+    from benchmarks.mock_apify import MockApifyServer
+    
+    apify_scraper._run_inputs.clear()
+    with MockApifyServer(latency=0, run_duration=0) as server, \
+            scraper_settings(base_url=server.base_url, reuse_runs=True):
+        payload = apify_scraper.hashtag_payload("#food", 5)
+        assert apify_scraper.find_reusable_run(payload) is None, "Nothing to reuse yet"
+        assert len(apify_scraper.scrape_payload(payload, "empty", verbose=False)) == 5
+        assert server.request_counts["start_run"] == 1
+        
+        # Same input: the finished run is reused and no new run is started
+        run = apify_scraper.find_reusable_run(payload)
+        assert run is not None and run["status"] == "SUCCEEDED"
+        assert len(apify_scraper.scrape_payload(payload, "empty", verbose=False)) == 5
+        assert server.request_counts["start_run"] == 1, "Should reuse the matching run"
+        assert server.request_counts["list_runs"] >= 1
+        
+        # Different input: the run does not match
+        other = apify_scraper.hashtag_payload("#travel", 5)
+        assert apify_scraper.find_reusable_run(other) is None, "Should not reuse a run with different input"
+        apify_scraper.scrape_payload(other, "empty", verbose=False)
+        assert server.request_counts["start_run"] == 2
+        
+        # Runs that finished longer than max_age ago are ignored
+        time.sleep(0.2)
+        assert apify_scraper.find_reusable_run(payload, max_age=0.1) is None, "Should ignore runs older than max_age"
+        assert apify_scraper.find_reusable_run(payload, max_age=60) is not None
+        
+        # Inputs of runs we started are known locally; other runs' INPUT records are downloaded once
+        assert server.request_counts.get("get_record", 0) == 0, "Should not download inputs we already know"
+        apify_scraper._run_inputs.clear()
+        assert apify_scraper.find_reusable_run(payload) is not None
+        assert server.request_counts["get_record"] == 2
+        assert apify_scraper.find_reusable_run(other) is not None
+        assert server.request_counts["get_record"] == 2, "Should memoize INPUT records by key-value store"
+
+def test_api_governor():
+    """Test Retry-After handling and the shared request budget"""
+    import time
+    import requests
+    from email.utils import formatdate
+    from apify_scraper import ApifyClient, ApiGovernor, _parse_retry_after
+    from benchmarks.mock_apify import MockApifyServer
+    
+    assert _parse_retry_after("3") == 3.0
+    assert _parse_retry_after(None) is None and _parse_retry_after("soon") is None
+    assert 0 < _parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30, "Should accept HTTP dates"
+    
+    governor = ApiGovernor(requests_per_second=None, max_retries=1)
+    response = requests.Response()
+    response.status_code = 429
+    response.headers["Retry-After"] = "0"
+    assert governor.retry_delay(response, attempt=0) is not None, "Should retry a 429"
+    assert governor.retry_delay(response, attempt=1) is None, "Should give up after max_retries"
+    response.status_code = 404
+    assert governor.retry_delay(response, attempt=0) is None, "Should not retry other errors"
+    
+    # Sync and async runs share the same run slots
+    import asyncio
+    governor = ApiGovernor(requests_per_second=None, max_active_runs=2)
+    active, peak = [0], [0]
+    
+    async def hold_slot():
+        async with governor.async_run_slot(poll_interval=0.01):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.05)
+            active[0] -= 1
+    
+    async def hold_slots(count):
+        await asyncio.gather(*(hold_slot() for _ in range(count)))
+    
+    asyncio.run(hold_slots(5))
+    assert peak[0] == 2, "Should cap async runs at max_active_runs"
+    peak[0] = 0
+    with governor.run_slot():
+        asyncio.run(hold_slots(3))
+    assert peak[0] == 1, "A blocking run should take one of the async slots"
+    
+    # The mock answers 429 beyond 2 requests per second; every call should still succeed
+    with MockApifyServer(latency=0, run_duration=0, rate_limit=2) as server:
+        client = ApifyClient(token="test", base_url=server.base_url, governor=ApiGovernor(requests_per_second=None))
+        for _ in range(4):
+            assert client.list_runs("actor") == []
+        client.close()
+        assert server.request_counts["rate_limited"] >= 1, "Should have been throttled by the server"
+        assert server.request_counts["list_runs"] == 4
+
+def test_async_scraper():
+    """Test the asyncio scraper against a local mock of the Apify API"""
+    try:
+        import httpx
+    except ImportError:
+        print("⚠️  httpx not installed - skipping async scraper tests")
+        return
+    
+    import asyncio
+    import async_scraper
+    from apify_scraper import ApiGovernor
+    from benchmarks.mock_apify import MockApifyServer
+    
+    async def scrape(base_url):
+        governor = ApiGovernor(max_active_runs=3)
+        async with async_scraper.AsyncApifyClient(base_url=base_url, governor=governor) as client:
+            async_scraper.set_client(client)
+            posts = await async_scraper.run_scraper("someone", incremental=False)
+            merged = await async_scraper.run_scraper_by_hashtags(["#food", "#yummy", "#tasty", "#chef"], max_posts=8)
+            counts = await async_scraper.scrape_hashtags_from_tag("#food", max_posts=5)
+            return posts, merged, counts
+    
+    with MockApifyServer(latency=0, run_duration=0.1) as server, scraper_settings():
+        posts, merged, counts = asyncio.run(scrape(server.base_url))
+        assert server.request_counts["start_run"] == 6, "Should start one run per scrape"
+    
+    assert isinstance(posts, list) and len(posts) > 0, "Should return a list of posts"
+    assert len(merged) == len({post["shortCode"] for post in merged}), "Should de-duplicate merged posts"
+    assert isinstance(counts, dict) and counts, "Should count hashtags in the sample"
+    
+    # With the result cache and run journal on, a dataset is cached page by page and served on the next scrape
+    import os
+    import tempfile
+    import cache
+    
+    async def scrape_twice(base_url, payload):
+        async with async_scraper.AsyncApifyClient(base_url=base_url) as client:
+            async_scraper.set_client(client)
+            first = await async_scraper.scrape_payload(payload, "empty", verbose=False)
+            second = await async_scraper.scrape_payload(payload, "empty", verbose=False)
+            return first, second
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        payload = async_scraper.hashtag_payload("#food", 250)
+        with MockApifyServer(latency=0, run_duration=0) as server, \
+                scraper_settings(result_cache=True, run_journal=True,
+                                 _result_cache=cache.ResultCache(directory=os.path.join(tmp_dir, "results")),
+                                 _run_journal=cache.RunJournal(path=os.path.join(tmp_dir, "runs.json"))):
+            first, second = asyncio.run(scrape_twice(server.base_url, payload))
+            assert server.request_counts["start_run"] == 1, "Second scrape should be served from the cache"
+    assert len(first) == 250 and second == first, "Cached posts should match the fetched ones"
+
 def test_visualizer():
     """Test the visualizer module"""
     try:
@@ -185,6 +735,17 @@ def main():
         ("Engagement Estimator", test_engagement_estimator),
         ("Domain Configuration", test_domain_configuration),
         ("Trending Hashtags", test_trending_hashtags),
+        ("Caches", test_caches),
+        ("Incremental Profiles", test_incremental_profiles),
+        ("Post Store", test_post_store),
+        ("Background Jobs", test_jobs),
+        ("API Governor", test_api_governor),
+        ("Run Journal", test_run_journal),
+        ("Run Reuse", test_run_reuse),
+        ("Hashtag Fan-out", test_hashtag_fanout),
+        ("Profile Batches", test_profile_batches),
+        ("Batch Mode", test_batch_mode),
+        ("Async Scraper", test_async_scraper),
         ("Visualizer", test_visualizer),
     ]
     
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+HOURS_PER_DAY = 24
+NUM_SLOTS = len(DAY_NAMES) * HOURS_PER_DAY
+
+SLOT_FIELDS = ["count", "likes_mean", "likes_median", "comments_mean", "comments_median", "engagement_rate"]
+
+
+def _group_medians(slots, values, counts):
+    """
+    Median of values per slot; slots with no posts get NaN
+    """
+    medians = np.full(NUM_SLOTS, np.nan)
+    if not len(values):
+        return medians
+    # Sorting by (slot, value) lays every slot's values out contiguously and in order
+    sorted_values = values[np.lexsort((values, slots))]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    has_posts = counts > 0
+    low = starts[has_posts] + (counts[has_posts] - 1) // 2
+    high = starts[has_posts] + counts[has_posts] // 2
+    medians[has_posts] = (sorted_values[low] + sorted_values[high]) / 2
+    return medians
+
+
+class TimeSlotStats:
+    """
+    Per-slot post statistics on a dense 7x24 grid (day of week x hour of day).
+
+    Every field is a (7, 24) numpy array indexed [day, hour] with Monday = 0.
+    Slots without posts have a count of 0 and NaN for the other fields.
+    engagement_rate is the slot's mean likes + comments per post relative to
+    the mean over all posts, so 1.5 means 50% above average.
+    """
+
+    def __init__(self, count, likes_mean, likes_median, comments_mean, comments_median, engagement_rate):
+        self.count = count
+        self.likes_mean = likes_mean
+        self.likes_median = likes_median
+        self.comments_mean = comments_mean
+        self.comments_median = comments_median
+        self.engagement_rate = engagement_rate
+
+    @property
+    def empty(self):
+        return not self.count.any()
+
+    def matrix(self, field="likes_mean"):
+        """
+        One field as a 7x24 DataFrame (day names down, hours across)
+        """
+        return pd.DataFrame(
+            getattr(self, field),
+            index=pd.Index(DAY_NAMES, name="day"),
+            columns=pd.Index(np.arange(HOURS_PER_DAY, dtype=np.int32), name="hour"),
+        )
+
+    def to_frame(self):
+        """
+        Long format: one row per slot that has posts, indexed by (day name, hour)
+        """
+        days, hours = np.nonzero(self.count)
+        index = pd.MultiIndex.from_arrays(
+            [np.array(DAY_NAMES, dtype=object)[days], hours.astype(np.int32)],
+            names=["day", "hour"],
+        )
+        return pd.DataFrame({field: getattr(self, field)[days, hours] for field in SLOT_FIELDS}, index=index)
+
+
+def compute_time_slots(df, timestamp_column="takenAtTimestamp"):
+    """
+    Aggregate posts by day of week and hour in one pass without modifying df.
+
+    Day and hour are derived once as a single small integer slot code per post;
+    counts and sums come from bincount over those codes and medians from one
+    sort, so no per-row strings or extra DataFrame columns are created.
+    Posts without a timestamp are ignored.
+    """
+    timestamps = df[timestamp_column]
+    valid = timestamps.notna().to_numpy()
+    timestamps = timestamps[valid]
+
+    slots = (timestamps.dt.dayofweek.to_numpy(dtype=np.int16) * HOURS_PER_DAY
+             + timestamps.dt.hour.to_numpy(dtype=np.int16))
+    likes = df["likesCount"].to_numpy(dtype=np.float64)[valid]
+    comments = df["commentsCount"].to_numpy(dtype=np.float64)[valid]
+
+    counts = np.bincount(slots, minlength=NUM_SLOTS)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        likes_mean = np.bincount(slots, weights=likes, minlength=NUM_SLOTS) / counts
+        comments_mean = np.bincount(slots, weights=comments, minlength=NUM_SLOTS) / counts
+        overall_engagement = (likes.sum() + comments.sum()) / len(likes) if len(likes) else np.nan
+        engagement_rate = (likes_mean + comments_mean) / overall_engagement
+
+    shape = (len(DAY_NAMES), HOURS_PER_DAY)
+    return TimeSlotStats(
+        count=counts.reshape(shape),
+        likes_mean=likes_mean.reshape(shape),
+        likes_median=_group_medians(slots, likes, counts).reshape(shape),
+        comments_mean=comments_mean.reshape(shape),
+        comments_median=_group_medians(slots, comments, counts).reshape(shape),
+        engagement_rate=engagement_rate.reshape(shape),
+    )
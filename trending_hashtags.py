@@ -1,15 +1,26 @@
-import requests
-import json
-import time
+import contextvars
+import queue
 import random
-from config import APIFY_TOKEN, MAX_RETRIES, RETRY_DELAY, DOMAIN_HASHTAGS
+import threading
+from collections import Counter
+from config import MAX_RETRIES, RETRY_DELAY, DOMAIN_HASHTAGS, TRENDING_SAMPLE_SIZE
+from apify_scraper import scrape_payload, hashtag_payload, RateLimiter
+from analyze_hashtags import HASHTAG_PATTERN
+from cache import get_trending_cache
+from instrumentation import report_progress
 
-PUBLIC_ACTOR_ID = "apify~instagram-scraper"
+DISCOVERY_CONCURRENCY = 3        # Seed hashtags sampled at the same time
+DISCOVERY_RUNS_PER_SECOND = 0.5  # Shared budget for starting discovery runs
+DISCOVERY_BURST = 2              # Runs that may start back-to-back before throttling
 
-def discover_trending_hashtags_for_domain(domain, sample_size=3):
+_discovery_limiter = RateLimiter(DISCOVERY_RUNS_PER_SECOND, burst=DISCOVERY_BURST)
+
+
+def discover_trending_hashtags_for_domain(domain, sample_size=3, max_workers=DISCOVERY_CONCURRENCY):
     """
     Discover trending hashtags for a domain by sampling multiple seed hashtags
-    and analyzing the most co-occurring hashtags
+    and analyzing the most co-occurring hashtags.
+    Seed hashtags are scraped concurrently (up to max_workers at once).
     """
     if domain.lower() not in DOMAIN_HASHTAGS:
         print(f"❌ Unknown domain: {domain}")
@@ -19,23 +30,17 @@ def discover_trending_hashtags_for_domain(domain, sample_size=3):
     print(f"🔍 Discovering trending hashtags for {domain.upper()} domain...")
     print(f"🌱 Using seed hashtags: {', '.join(seed_hashtags[:sample_size])}")
     
-    all_discovered_hashtags = {}
+    all_discovered_hashtags = Counter()
     
     # Sample a few seed hashtags to get diverse data
     sample_hashtags = random.sample(seed_hashtags, min(sample_size, len(seed_hashtags)))
+    report_progress("discovery", f"Discovering trending {domain} hashtags from {len(sample_hashtags)} seeds",
+                    domain=domain, seeds=len(sample_hashtags))
     
-    for seed_hashtag in sample_hashtags:
-        print(f"📊 Sampling from {seed_hashtag}...")
-        hashtags = scrape_hashtags_from_tag(seed_hashtag, max_posts=20)
-        
+    # Merge co-occurrence counts as each sample finishes
+    for hashtags in sample_seed_hashtags(sample_hashtags, max_workers):
         if hashtags:
-            for hashtag, count in hashtags.items():
-                if hashtag not in all_discovered_hashtags:
-                    all_discovered_hashtags[hashtag] = 0
-                all_discovered_hashtags[hashtag] += count
-        
-        # Small delay between requests
-        time.sleep(2)
+            all_discovered_hashtags.update(hashtags)
     
     # Filter and rank discovered hashtags
     trending_hashtags = filter_trending_hashtags(all_discovered_hashtags, domain, min_frequency=2)
@@ -44,72 +49,76 @@ def discover_trending_hashtags_for_domain(domain, sample_size=3):
     return trending_hashtags[:15]  # Return top 15
 
 
-def scrape_hashtags_from_tag(hashtag, max_posts=20):
+def sample_seed_hashtags(seed_hashtags, max_workers=DISCOVERY_CONCURRENCY):
     """
-    Scrape a small sample of posts from a hashtag to discover co-occurring hashtags
+    Scrape the seed hashtags on up to max_workers threads, yielding each one's
+    hashtag counts as it finishes.
+    
+    The workers are daemon threads rather than a ThreadPoolExecutor, whose threads
+    are joined at interpreter exit: discovery also runs as a background cache
+    refresh, and that must never keep a finished CLI run from exiting.
+    """
+    tasks = queue.Queue()
+    for seed_hashtag in seed_hashtags:
+        print(f"📊 Sampling from {seed_hashtag}...")
+        # Each sample runs in a copy of our context so progress events reach our listener
+        tasks.put((seed_hashtag, contextvars.copy_context()))
+    results = queue.Queue()
+    
+    def work():
+        while True:
+            try:
+                seed_hashtag, context = tasks.get_nowait()
+            except queue.Empty:
+                return
+            hashtags = {}
+            try:
+                hashtags = context.run(scrape_hashtags_from_tag, seed_hashtag, 20, _discovery_limiter)
+            finally:
+                results.put(hashtags)
+    
+    for index in range(max(1, min(max_workers, len(seed_hashtags)))):
+        threading.Thread(target=work, name=f"trending-seed-{index}", daemon=True).start()
+    for _ in seed_hashtags:
+        yield results.get()
+
+
+def count_caption_hashtags(posts):
+    """
+    Count how often each hashtag appears across the posts' captions
+    """
+    hashtag_counts = {}
+    for post in posts:
+        caption = post.get('caption', '')
+        if caption:
+            for tag in HASHTAG_PATTERN.findall(caption.lower()):
+                hashtag_counts[tag] = hashtag_counts.get(tag, 0) + 1
+    return hashtag_counts
+
+
+def scrape_hashtags_from_tag(hashtag, max_posts=20, rate_limiter=None):
+    """
+    Scrape a small sample of posts from a hashtag to discover co-occurring hashtags.
+    If a rate_limiter is given, the actor run is only started once it allows.
     """
     try:
-        run_url = f"https://api.apify.com/v2/acts/{PUBLIC_ACTOR_ID}/runs?token={APIFY_TOKEN}"
-        
-        # Clean hashtag
-        clean_hashtag = hashtag.replace('#', '')
-        hashtag_url = f"https://www.instagram.com/explore/tags/{clean_hashtag}/"
-        
-        payload = {
-            "directUrls": [hashtag_url],
-            "resultsLimit": max_posts,
-            "searchType": "hashtag",
-            "addParentData": False,
-            "searchLimit": max_posts,
-            "proxy": {
-                "useApifyProxy": True
-            }
-        }
+        payload = hashtag_payload(hashtag, max_posts)
         
-        # Start the scraping run
-        response = requests.post(run_url, json=payload)
-        response.raise_for_status()
-        run_data = response.json()
-        run_id = run_data['data']['id']
+        if rate_limiter is not None:
+            rate_limiter.acquire()
         
-        # Poll for completion (shorter timeout for discovery)
-        for attempt in range(MAX_RETRIES * 2):
-            status_url = f"https://api.apify.com/v2/acts/{PUBLIC_ACTOR_ID}/runs/{run_id}?token={APIFY_TOKEN}"
-            status_response = requests.get(status_url)
-            status_response.raise_for_status()
-            status_data = status_response.json()
-            status = status_data['data']['status']
-            
-            if status == 'SUCCEEDED':
-                break
-            elif status in ['FAILED', 'ABORTED']:
-                print(f"⚠️  Sample from {hashtag} failed")
-                return {}
-            
-            time.sleep(RETRY_DELAY)
+        # Run the scraper (shorter timeout for discovery)
+        data = scrape_payload(
+            payload,
+            f"⚠️  Sample from {hashtag} returned no posts",
+            timeout=MAX_RETRIES * 2 * RETRY_DELAY,
+            verbose=False
+        )
+        if data is None:
+            print(f"⚠️  Sample from {hashtag} failed")
+            return {}
         
-        # Get the data
-        if status == 'SUCCEEDED':
-            dataset_id = status_data['data']['defaultDatasetId']
-            results_url = f"https://api.apify.com/v2/datasets/{dataset_id}/items?token={APIFY_TOKEN}"
-            results_response = requests.get(results_url)
-            results_response.raise_for_status()
-            data = results_response.json()
-            
-            # Extract hashtags from captions
-            hashtag_counts = {}
-            if data:
-                for post in data:
-                    caption = post.get('caption', '')
-                    if caption:
-                        import re
-                        found_hashtags = re.findall(r"#\w+", caption.lower())
-                        for tag in found_hashtags:
-                            hashtag_counts[tag] = hashtag_counts.get(tag, 0) + 1
-            
-            return hashtag_counts
-        
-        return {}
+        return count_caption_hashtags(data)
         
     except Exception as e:
         print(f"⚠️  Error sampling {hashtag}: {e}")
@@ -137,15 +146,23 @@ def filter_trending_hashtags(hashtag_counts, domain, min_frequency=2):
     return trending_list
 
 
-def get_hashtags_for_domain(domain, use_trending=True, fallback_to_static=True):
+def get_hashtags_for_domain(domain, use_trending=True, fallback_to_static=True,
+                            sample_size=TRENDING_SAMPLE_SIZE, use_cache=True):
     """
-    Main function to get hashtags for a domain - tries trending first, falls back to static
+    Main function to get hashtags for a domain - tries trending first, falls back to static.
+    Trending results are served from the on-disk cache when use_cache is set.
     """
     hashtags = []
     
     if use_trending:
         try:
-            hashtags = discover_trending_hashtags_for_domain(domain)
+            if use_cache:
+                hashtags = get_trending_cache().get_or_discover(
+                    domain, sample_size,
+                    lambda d, n: discover_trending_hashtags_for_domain(d, sample_size=n)
+                )
+            else:
+                hashtags = discover_trending_hashtags_for_domain(domain, sample_size=sample_size)
             if hashtags:
                 print(f"🚀 Using {len(hashtags)} trending hashtags for {domain}")
                 return hashtags